@@ -0,0 +1,208 @@
+import uuid
+from dataclasses import dataclass
+
+import django_rq
+from core.models import Job
+from django.db import transaction
+from extras.choices import LogLevelChoices
+from local.display_fields import customs
+from local.nice_circuits import NiceBulkCircuits
+from local.utils import ScriptLogger
+from rq.job import Dependency
+
+FAN_OUT_QUEUE = "default"
+# RQ's defaults (3 minutes, 500 seconds) are too short for large chunks & to read their results
+FAN_OUT_JOB_TIMEOUT = customs["fan_out_job_timeout"]
+FAN_OUT_RESULT_TTL = customs["fan_out_result_ttl"]
+
+# In-process stand-in queues in use, by name (see InProcessQueue)
+LOCAL_QUEUES = {}
+
+
+@dataclass
+class InProcessJob:
+    id: str
+    result: object = None
+
+
+class InProcessQueue:
+    """
+    Local stand-in for an RQ queue: runs each job immediately, in-process (tests, or no workers available)
+
+    Used as a context manager, get_queue() returns it (instead of the RQ queue of the same name) until exit.
+    """
+
+    def __init__(self, name: str = FAN_OUT_QUEUE):
+        self.name = name
+        self.jobs = {}
+
+    def __enter__(self) -> "InProcessQueue":
+        LOCAL_QUEUES[self.name] = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        LOCAL_QUEUES.pop(self.name, None)
+
+    def enqueue(self, func, *args, depends_on=None, job_timeout=None, result_ttl=None, **kwargs) -> InProcessJob:
+        job = InProcessJob(id=str(uuid.uuid4()))
+        self.jobs[job.id] = job
+        job.result = func(*args, **kwargs)
+        return job
+
+    def fetch_job(self, job_id: str) -> InProcessJob | None:
+        return self.jobs.get(job_id)
+
+
+def get_queue(name: str = FAN_OUT_QUEUE):
+    if name in LOCAL_QUEUES:
+        return LOCAL_QUEUES[name]
+    return django_rq.get_queue(name)
+
+
+class JobLogger:
+    """
+    Stand-in for a Script's log_* methods, appending the messages to the log of a finished Script run (NetBox Job),
+    as shown on its result page.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.log = []
+
+    def log_debug(self, message):
+        self.log.append({"status": LogLevelChoices.LOG_DEFAULT, "message": str(message)})
+
+    def log_info(self, message):
+        self.log.append({"status": LogLevelChoices.LOG_INFO, "message": str(message)})
+
+    def log_success(self, message):
+        self.log.append({"status": LogLevelChoices.LOG_SUCCESS, "message": str(message)})
+
+    def log_warning(self, message):
+        self.log.append({"status": LogLevelChoices.LOG_WARNING, "message": str(message)})
+
+    def log_failure(self, message):
+        self.log.append({"status": LogLevelChoices.LOG_FAILURE, "message": str(message)})
+
+    def save(self) -> None:
+        job = Job.objects.filter(job_id=self.job_id).first()
+        if job is None:
+            return
+        data = job.data or {}
+        data["log"] = [*data.get("log", []), *self.log]
+        job.data = data
+        job.save(update_fields=["data"])
+
+
+def log_summary(logger, summary: dict) -> None:
+    """Log a fan out summary (see aggregate_chunks) through logger's log_* methods"""
+    logger.log_info("---")
+    logger.log_info(
+        f"Bulk Circuits: {summary['rows']} rows in {summary['chunks']} chunks, "
+        f"{len(summary['succeeded'])} succeeded, {len(summary['failed'])} failed, "
+        f"{len(summary['failed_chunks'])} chunks failed."
+    )
+    if summary["succeeded"]:
+        logger.log_success(f"**Successes:** {', '.join(summary['succeeded'])}")
+    if summary["failed"]:
+        logger.log_failure(f"**Failures:** {', '.join(summary['failed'])}")
+    if summary["failed_chunks"]:
+        logger.log_failure(f"**Failed chunk jobs:** {', '.join(summary['failed_chunks'])}")
+
+
+def import_chunk(rows: list[tuple[int, dict]], overwrite: bool = False, skip_unchanged: bool = False) -> dict:
+    """
+    Background job: import one chunk of numbered CSV rows in its own transaction
+
+    Returns:
+        The chunk's summary
+    """
+    logger = ScriptLogger()
+    summary = {"rows": len(rows), "succeeded": [], "failed": []}
+
+    with transaction.atomic():
+        # The whole chunk at once: one port index for its "next" Patch Panel Ports
+        staged = NiceBulkCircuits.stage_rows(logger, rows, overwrite=overwrite, isolate_rows=True)
+        staged_rows = {circuit.row_num for circuit in staged}
+        summary["failed"] += [row.get("cid") or f"Row {row_num}" for row_num, row in rows if row_num not in staged_rows]
+
+        results = NiceBulkCircuits.create_circuits(
+            logger, staged, skip_unchanged=skip_unchanged, isolate_rows=True
+        )
+
+    for result in results.values():
+        summary["succeeded" if result["result"] else "failed"].append(result["cid"])
+
+    return summary
+
+
+def aggregate_chunks(job_ids: list[str], queue_name: str = FAN_OUT_QUEUE, script_job_id: str | None = None) -> dict:
+    """
+    Background job, runs once every chunk job finished: combine the chunk summaries into the parent summary
+
+    script_job_id: the enqueuing Script run's job, the summary is appended to its log
+    """
+    queue = get_queue(queue_name)
+    summary = {"chunks": len(job_ids), "rows": 0, "succeeded": [], "failed": [], "failed_chunks": []}
+
+    for job_id in job_ids:
+        job = queue.fetch_job(job_id)
+        if job is None or job.result is None:
+            summary["failed_chunks"].append(job_id)
+            continue
+        summary["rows"] += job.result["rows"]
+        summary["succeeded"] += job.result["succeeded"]
+        summary["failed"] += job.result["failed"]
+
+    log_summary(ScriptLogger(), summary)
+    if script_job_id:
+        job_logger = JobLogger(script_job_id)
+        log_summary(job_logger, summary)
+        job_logger.save()
+    return summary
+
+
+def fan_out(
+    rows: list[tuple[int, dict]],
+    chunks: int,
+    overwrite: bool = False,
+    skip_unchanged: bool = False,
+    queue=None,
+    script_job_id: str | None = None,
+    job_timeout: int = FAN_OUT_JOB_TIMEOUT,
+    result_ttl: int = FAN_OUT_RESULT_TTL,
+):
+    """
+    Split numbered CSV rows into site-partitioned chunks (no two chunks share a patch panel),
+    enqueue one background job per chunk, and a parent job aggregating their results.
+
+    queue: RQ (or InProcessQueue) queue, defaults to FAN_OUT_QUEUE
+    script_job_id: the enqueuing Script run's RQ job, the parent job waits for it & appends the summary to its log
+    job_timeout, result_ttl: seconds each job may run, seconds its result is kept (chunk results are read by the parent)
+
+    Returns:
+        The chunk jobs & the parent job
+    """
+    queue = queue or get_queue()
+    partitions = NiceBulkCircuits.partition_rows_by_site(rows, chunks)
+
+    jobs = [
+        queue.enqueue(
+            import_chunk, partition, overwrite, skip_unchanged, job_timeout=job_timeout, result_ttl=result_ttl
+        )
+        for partition in partitions
+    ]
+    # Runs once every chunk job finished, failed or not (see aggregate_chunks' failed_chunks),
+    # and the Script run saved its log
+    dependencies = [*jobs, script_job_id] if script_job_id else jobs
+    parent = queue.enqueue(
+        aggregate_chunks,
+        [job.id for job in jobs],
+        queue.name,
+        script_job_id,
+        depends_on=Dependency(jobs=dependencies, allow_failure=True),
+        job_timeout=job_timeout,
+        result_ttl=result_ttl,
+    )
+
+    return jobs, parent
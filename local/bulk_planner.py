@@ -0,0 +1,241 @@
+import re
+from dataclasses import dataclass, field
+
+import local.utils as utils
+from circuits.models import Circuit
+from dcim.models import FrontPort, Interface, RearPort
+from django.db import transaction
+from local.topology import trace_paths
+
+STANDARD = "Standard Circuit"
+P2P = "P2P Circuit"
+MEET_ME = "MeetMe Circuit"
+# Failure of one row, as logged by NiceBulkCircuits.stage_rows & create_circuits
+ROW_MESSAGE = re.compile(r"\s*Row (\d+): (.*)", re.DOTALL)
+
+
+@dataclass(slots=True)
+class RowPlan:
+    """The planned changes (or errors) for one CSV row"""
+
+    row_num: int
+    cid: str
+    script_type: str
+    action: str = "Create"
+    steps: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+class PlanLogger(utils.ScriptLogger):
+    """
+    Logger of a planned import: keeps the failures of each row ("Row N: ..." messages) for its RowPlan,
+    everything else goes to the python logger only
+    """
+
+    def __init__(self):
+        super().__init__("netbox.scripts.nice_circuits.plan")
+        self.failures = {}
+
+    def log_failure(self, message):
+        match = ROW_MESSAGE.match(str(message))
+        if match:
+            self.failures.setdefault(int(match.group(1)), []).append(match.group(2))
+        else:
+            super().log_failure(message)
+
+
+class BulkPlanner:
+    """
+    Dry-run for BulkCircuits: the rows go through the actual import (NiceBulkCircuits.stage_rows, find_cable_conflicts
+    & create_circuits) in a transaction that is always rolled back, so the plan is what the import would do.
+    Every row is planned as if it didn't allow skipping: any failure is reported, nothing is skipped silently.
+    """
+
+    def __init__(self, rows: list[tuple[int, dict]], overwrite: bool = False):
+        """
+        Args:
+            rows: Numbered CSV rows, see NiceBulkCircuits.load_rows()
+            overwrite: Overwrite existing circuits (overrides the per row value)
+        """
+        self.rows = [(row_num, {**row, "allow_skip": False}) for row_num, row in rows]
+        self.overwrite = overwrite
+
+    def plan(self) -> list[RowPlan]:
+        """Plan every row, in order"""
+        # Imported here, local.nice_circuits imports find_cable_conflicts from this module
+        from local.nice_circuits import NiceBulkCircuits
+
+        logger = PlanLogger()
+        staged = NiceBulkCircuits.stage_rows(logger, self.rows, overwrite=self.overwrite, isolate_rows=True)
+        existing = set(
+            Circuit.objects.filter(cid__in={circuit.cid for circuit in staged}).values_list("cid", "provider_id")
+        )
+        with transaction.atomic():
+            results = NiceBulkCircuits.create_circuits(logger, staged, isolate_rows=True)
+            transaction.set_rollback(True)
+
+        staged = {circuit.row_num: circuit for circuit in staged}
+        plans = []
+        for row_num, row in self.rows:
+            plan = RowPlan(row_num=row_num, cid=row.get("cid", ""), script_type=row.get("nice_script_type"))
+            plan.errors = logger.failures.get(row_num, [])
+            if row_num in staged:
+                circuit = staged[row_num]
+                plan.action = "Update" if (circuit.cid, circuit.provider_id) in existing else "Create"
+                plan.steps = self._steps(circuit, row, plan.action)
+                if not plan.errors and not results.get(row_num, {}).get("result"):
+                    plan.errors.append(f"CID '{circuit.cid}': Not created, see the log")
+            plans.append(plan)
+        return plans
+
+    def _steps(self, staged, row: dict, action: str) -> list[str]:
+        """The changes of a staged row"""
+        steps = [f"{action} Circuit: {staged.cid} ({row.get('provider')})", f"Termination A: {row.get('side_a_site')}"]
+        if staged.script_type == P2P:
+            steps.append(f"Termination Z: {row.get('side_z_site')}")
+        else:
+            steps.append(f"Termination Z: {row.get('side_z_providernetwork')}")
+
+        if staged.script_type == MEET_ME:
+            steps.append(f"Cable: Termination A <-> {row.get('mm_pp')}/{row.get('mm_pp_port')}")
+            upstream = f"{row.get('mm_pp')}/{row.get('mm_pp_port')} (FrontPort)"
+            steps += self._side_steps(staged, row, "A", "", upstream=upstream)
+        else:
+            steps += self._side_steps(staged, row, "A", "")
+        if staged.script_type == P2P:
+            steps += self._side_steps(staged, row, "Z", "z_")
+        return steps
+
+    def _side_steps(self, staged, row: dict, side: str, prefix: str, upstream: str = "") -> list[str]:
+        """
+        The cables of one side (device <-> patch panel (optional) <-> termination)
+
+        upstream: What the patch panel is cabled to, if not the termination (Meet Me)
+        """
+        upstream = upstream or f"Termination {side}"
+        pp = row.get(f"{prefix}pp")
+        pp_port = row.get(f"{prefix}pp_port")
+        device = f"{row.get(f'{prefix}device')}/{row.get(f'{prefix}interface')}"
+        steps = []
+
+        # New Patch Panel Port, numbered by stage_rows ("next" ports included)
+        new_port = getattr(staged, f"{prefix}pp_new_port")
+        if new_port:
+            pp_port = f"Rear{new_port}"
+            positions = getattr(staged, f"{prefix}pp_port_positions") or 1
+            front_ports = f"Front{new_port}"
+            if positions > 1:
+                front_ports = f"Front{new_port}-1 - Front{new_port}-{positions} (cassette)"
+            steps.append(f"Create Patch Panel Port: {pp}/{pp_port} & {front_ports}")
+
+        if getattr(staged, f"{prefix}direct_to_device"):
+            steps.append(f"Cable: {upstream} <-> {device}")
+        else:
+            position = getattr(staged, f"{prefix}pp_port_position") or 1
+            front_port = f"FrontPort, Position {position}" if position > 1 else "FrontPort"
+            steps.append(f"Cable: {upstream} <-> {pp}/{pp_port}")
+            steps.append(f"Cable: {pp}/{pp_port} ({front_port}) <-> {device}")
+        return steps
+
+
+def circuit_cables(circuit_keys: set[tuple[str, int]]) -> dict[tuple[str, int], set[int]]:
+    """
+    Cables on the paths of existing circuits, re-synced (not conflicts) when the circuit is overwritten
+
+    circuit_keys: (cid, provider_id) of the circuits
+
+    Returns:
+        {(cid, provider_id): cable ids}, for the existing circuits only
+    """
+    if not circuit_keys:
+        return {}
+
+    circuits = {}
+    for pk, cid, provider_id in Circuit.objects.filter(cid__in={cid for cid, _ in circuit_keys}).values_list(
+        "pk", "cid", "provider_id"
+    ):
+        if (cid, provider_id) in circuit_keys:
+            circuits[pk] = (cid, provider_id)
+    if not circuits:
+        return {}
+
+    cables = {}
+    for path in trace_paths(set(circuits)):
+        cables.setdefault(circuits[path.circuit_id], set()).update(path.cable_ids)
+    return cables
+
+
+def find_cable_conflicts(staged_circuits: list) -> dict[int, list[str]]:
+    """
+    Pre-write cable validation of staged rows (see StagedCircuit.cable_ports): Interfaces & Patch Panel Ports
+    already cabled, or claimed by an earlier row of the same file.
+    Occupancy is loaded in bulk, one query per model, instead of failing in Cable.full_clean() row by row.
+    The cables of the circuit an overwrite row re-syncs are not conflicts.
+
+    Returns:
+        {row_num: [errors]}, for the rows with conflicts only
+    """
+    claims = {staged.row_num: staged.cable_ports() for staged in staged_circuits}
+    interface_ids = {pk for ports in claims.values() for kind, pk, _ in ports if kind == "interface"}
+    rear_port_ids = {pk for ports in claims.values() for kind, pk, _ in ports if kind == "rear_port"}
+
+    # (kind, pk) -> (name, cable_id, positions)
+    ports = {}
+    for pk, device, name, cable_id in Interface.objects.filter(pk__in=interface_ids).values_list(
+        "pk", "device__name", "name", "cable_id"
+    ):
+        ports[("interface", pk)] = (f"Interface {device}/{name}", cable_id, 1)
+    for pk, device, name, cable_id, positions in RearPort.objects.filter(pk__in=rear_port_ids).values_list(
+        "pk", "device__name", "name", "cable_id", "positions"
+    ):
+        ports[("rear_port", pk)] = (f"Patch Panel Port {device}/{name}", cable_id, positions)
+    front_port_cables = {
+        (rear_port_id, position): cable_id
+        for rear_port_id, position, cable_id in FrontPort.objects.filter(rear_port_id__in=rear_port_ids).values_list(
+            "rear_port_id", "rear_port_position", "cable_id"
+        )
+    }
+
+    overwrites = {staged.row_num: (staged.cid, staged.provider_id) for staged in staged_circuits if staged.overwrite}
+    own_cables = circuit_cables(set(overwrites.values()))
+
+    conflicts = {}
+    claimed = {}
+    for row_num, row_ports in claims.items():
+        errors = []
+        own = own_cables.get(overwrites.get(row_num), set())
+        for kind, pk, position in row_ports:
+            name, cable_id, positions = ports.get((kind, pk), (f"{kind} {pk}", None, 1))
+            if positions > 1:
+                # Cassette: a single termination per RearPort (trunk), whatever the position
+                name = f"{name} (Position {position})"
+            if cable_id and cable_id not in own:
+                errors.append(f"{name} already has a Cable")
+            front_port_cable = front_port_cables.get((pk, position)) if kind == "rear_port" else None
+            if front_port_cable and front_port_cable not in own:
+                errors.append(f"{name} (FrontPort) already has a Cable")
+            if (kind, pk) in claimed:
+                errors.append(f"{name} is already used by row {claimed[(kind, pk)]}")
+            else:
+                claimed[(kind, pk)] = row_num
+        if errors:
+            conflicts[row_num] = errors
+
+    return conflicts
+
+
+def plan_report(plans: list[RowPlan]) -> str:
+    """Markdown table of the planned changes & errors"""
+    output = "| Row | Circuit ID | Type | Action | Plan | Errors |\n"
+    output += "|-----|------------|------|--------|------|--------|\n"
+    for plan in plans:
+        action = plan.action if plan.valid else "Fail"
+        output += (
+            f"| {plan.row_num} | {plan.cid} | {plan.script_type} | {action} "
+            f"| {'<br>'.join(plan.steps)} | {'<br>'.join(plan.errors)} |\n"
+        )
+    return output
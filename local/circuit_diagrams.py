@@ -0,0 +1,177 @@
+import hashlib
+
+from dcim.models import Cable, FrontPort, Interface, RearPort
+from circuits.models import Circuit, CircuitTermination
+from django.core.cache import cache
+import local.utils as utils
+from local.topology import FRONT_PORT, INTERFACE, REAR_PORT, CircuitNode, TopologyGraph
+
+DIAGRAM_CACHE_KEY = "nice_circuits:diagram"
+DIAGRAM_TIMEOUT = 60 * 60 * 24 * 7  # Seconds, the key changes anyway with the cabling (see _diagram_keys)
+DIAGRAM_CHUNK_SIZE = 1000  # Circuits per batch of queries
+NODE_IDS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Ports & interfaces on a path, with the device name for the labels
+PORT_MODELS = {INTERFACE: Interface, REAR_PORT: RearPort, FRONT_PORT: FrontPort}
+
+
+def _diagram_keys(graph: TopologyGraph) -> dict[int, str]:
+    """
+    Cache key of each circuit diagram, from the last_updated of its terminations, cables & ports,
+    and the name & last_updated of the ports' devices (labels), a constant number of queries for the whole graph
+    """
+    endpoints = {}
+    cable_ids = set()
+    termination_ids = set()
+    for circuit in graph.circuits.values():
+        for termination in circuit.terminations.values():
+            termination_ids.add(termination.pk)
+            if termination.path:
+                cable_ids.update(termination.path.cable_ids)
+                for model, pk in termination.path.ports:
+                    endpoints.setdefault(model, set()).add(pk)
+                if termination.path.interface_id:
+                    endpoints.setdefault(INTERFACE, set()).add(termination.path.interface_id)
+
+    updated = {
+        ("cable", pk): last_updated
+        for pk, last_updated in Cable.objects.filter(pk__in=cable_ids).values_list("pk", "last_updated")
+    }
+    updated |= {
+        ("termination", pk): last_updated
+        for pk, last_updated in CircuitTermination.objects.filter(pk__in=termination_ids).values_list(
+            "pk", "last_updated"
+        )
+    }
+    for model, pks in endpoints.items():
+        rows = PORT_MODELS[model].objects.filter(pk__in=pks).values_list(
+            "pk", "last_updated", "device__name", "device__last_updated"
+        )
+        updated |= {
+            (model, pk): (last_updated, device, device_updated)
+            for pk, last_updated, device, device_updated in rows
+        }
+
+    keys = {}
+    for circuit in graph.circuits.values():
+        parts = [circuit.cid, circuit.type]
+        for termination in circuit.terminations.values():
+            parts.append(f"{termination.term_side}:{termination.site}:{termination.provider_network}")
+            parts.append(updated.get(("termination", termination.pk)))
+            if termination.path:
+                parts += [updated.get(("cable", pk)) for pk in termination.path.cable_ids]
+                parts += [updated.get(port) for port in termination.path.ports]
+                parts.append(updated.get((INTERFACE, termination.path.interface_id)))
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+        keys[circuit.pk] = f"{DIAGRAM_CACHE_KEY}:{circuit.pk}:{digest}"
+    return keys
+
+
+def _port_labels(circuits: list[CircuitNode]) -> dict[tuple[str, int], str]:
+    """'Device/Port' label of the Interfaces & Patch Panel RearPorts on the paths, one query per model"""
+    endpoints = {}
+    for circuit in circuits:
+        for termination in circuit.terminations.values():
+            for hop in termination.path.hops if termination.path else ():
+                if hop.far and hop.far[0] in (INTERFACE, REAR_PORT):
+                    endpoints.setdefault(hop.far[0], set()).add(hop.far[1])
+
+    labels = {}
+    for model, pks in endpoints.items():
+        for pk, device, name in PORT_MODELS[model].objects.filter(pk__in=pks).values_list("pk", "device__name", "name"):
+            labels[(model, pk)] = f"{device}/{name}"
+    return labels
+
+
+def _side_chain(termination, label: str, port_labels: dict) -> tuple[list[str], list[str]]:
+    """
+    Nodes of one side, from the termination towards the device: Site -> [Patch Panel ->] Device/Interface,
+    and the cable between each node
+    """
+    nodes = [label]
+    cables = []
+    for hop in termination.path.hops if termination.path else ():
+        if hop.far:
+            nodes.append(port_labels.get(hop.far, hop.far_name or hop.far[0]))
+        else:
+            nodes.append("Not Connected")
+        cables.append(hop.cable)
+    return nodes, cables
+
+
+def _escape(label: str) -> str:
+    return str(label).replace('"', "#quot;")
+
+
+def render_diagram(circuit: CircuitNode, port_labels: dict) -> str:
+    """
+    Mermaid graph of the actual circuit path, in the layout of circuit-diagrams.md:
+        Standard/Meet Me: Device/Interface -> Patch Panel(s) -> Site/Circuit -> Provider Network
+        P2P: Device/Interface -> Patch Panel -> Site A -> Circuit -> Site Z -> Patch Panel -> Device/Interface
+    """
+    term_a = circuit.terminations.get("A")
+    term_z = circuit.terminations.get("Z")
+    nodes = []
+    cables = []  # Edge label between nodes[i] & nodes[i + 1], None if not a cable
+
+    if term_a and term_z and term_a.site_id and term_z.site_id:
+        side_a, cables_a = _side_chain(term_a, term_a.site, port_labels)
+        side_z, cables_z = _side_chain(term_z, term_z.site, port_labels)
+        nodes = side_a[::-1] + [circuit.cid] + side_z
+        cables = cables_a[::-1] + [None, None] + cables_z
+    else:
+        if term_a:
+            label = f"{term_a.site or term_a.provider_network}/{circuit.cid}"
+            side_a, cables_a = _side_chain(term_a, label, port_labels)
+            nodes, cables = side_a[::-1], cables_a[::-1]
+        else:
+            nodes = [circuit.cid]
+        if term_z:
+            nodes.append(term_z.provider_network or term_z.site)
+            cables.append(None)
+
+    lines = ["graph LR"]
+    lines += [f'{NODE_IDS[i]}["{_escape(label)}"]' for i, label in enumerate(nodes)]
+    for i, cable in enumerate(cables):
+        edge = f'-->|"{_escape(cable)}"|' if cable else "-->"
+        lines.append(f"{NODE_IDS[i]} {edge} {NODE_IDS[i + 1]}")
+    return "\n".join(lines)
+
+
+def _render_chunk(topology: TopologyGraph, circuit_ids: list[int]) -> dict[int, str]:
+    """Diagrams of one chunk of circuits, out of the (cached) topology graph: cached diagrams are not rendered again"""
+    graph = TopologyGraph({pk: topology.circuits[pk] for pk in circuit_ids if pk in topology.circuits})
+    keys = _diagram_keys(graph)
+    cached = cache.get_many(keys.values())
+
+    diagrams = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [circuit for pk, circuit in graph.circuits.items() if pk not in diagrams]
+    if missing:
+        port_labels = _port_labels(missing)
+        rendered = {circuit.pk: render_diagram(circuit, port_labels) for circuit in missing}
+        cache.set_many({keys[pk]: diagram for pk, diagram in rendered.items()}, DIAGRAM_TIMEOUT)
+        diagrams |= rendered
+
+    return diagrams
+
+
+def iter_circuit_diagrams(circuits=None, chunk_size: int = DIAGRAM_CHUNK_SIZE):
+    """
+    Stream (cid, Mermaid diagram) of the circuits, chunk by chunk
+
+    circuits: Circuit queryset, defaults to all circuits
+    """
+    circuits = Circuit.objects.all() if circuits is None else circuits
+    rows = circuits.order_by("cid", "pk").values_list("pk", "cid").iterator(chunk_size=chunk_size)
+    topology = TopologyGraph.load()
+    for chunk in utils.chunks(rows, chunk_size):
+        diagrams = _render_chunk(topology, [pk for pk, _ in chunk])
+        for pk, cid in chunk:
+            yield cid, diagrams[pk]
+
+
+def circuit_diagrams_markdown(circuits=None, chunk_size: int = DIAGRAM_CHUNK_SIZE) -> str:
+    """The diagrams as a Markdown document (see circuit-diagrams.md)"""
+    return "\n\n".join(
+        f"**{cid}**\n```mermaid\n{diagram}\n```" for cid, diagram in iter_circuit_diagrams(circuits, chunk_size)
+    )
@@ -0,0 +1,176 @@
+import csv
+
+from circuits.models import Circuit, CircuitTermination
+from dcim.models import FrontPort, Interface, RearPort
+import local.utils as utils
+from local.display_fields import HEADER_MAPPING
+from local.topology import FRONT_PORT, REAR_PORT, trace_paths
+
+EXPORT_CHUNK_SIZE = 1000  # Circuits per batch of queries
+
+
+class _Echo:
+    """File-like object handing each CSV line back to the caller (see iter_circuits_csv)"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _bool(value: bool) -> str:
+    return "TRUE" if value else "FALSE"
+
+
+def _export_chunk(circuit_ids: list[int]) -> list[dict]:
+    """
+    Rows for one chunk of circuits, with a constant number of queries (whatever the chunk size)
+    """
+    circuits = Circuit.objects.filter(pk__in=circuit_ids).order_by("pk")
+    circuits = circuits.values(
+        "pk",
+        "cid",
+        "description",
+        "provider__name",
+        "type__name",
+        "commit_rate",
+        "install_date",
+        "comments",
+        "custom_field_data",
+    )
+    terminations = {
+        (term["circuit_id"], term["term_side"]): term
+        for term in CircuitTermination.objects.filter(circuit_id__in=circuit_ids).values(
+            "circuit_id",
+            "term_side",
+            "site__name",
+            "provider_network__name",
+            "port_speed",
+            "upstream_speed",
+            "xconnect_id",
+            "pp_info",
+        )
+    }
+    paths = {(path.circuit_id, path.term_side): path for path in trace_paths(set(circuit_ids))}
+
+    # Names of every port & interface on the paths
+    rear_port_ids = {pk for path in paths.values() for model, pk in path.ports if model == REAR_PORT}
+    rear_ports = {
+        pk: (device, name, description)
+        for pk, device, name, description in RearPort.objects.filter(pk__in=rear_port_ids).values_list(
+            "pk", "device__name", "name", "description"
+        )
+    }
+    front_port_ids = {pk for path in paths.values() for model, pk in path.ports if model == FRONT_PORT}
+    positions = dict(FrontPort.objects.filter(pk__in=front_port_ids).values_list("pk", "rear_port_position"))
+    interfaces = {
+        pk: (device, name)
+        for pk, device, name in Interface.objects.filter(
+            pk__in={path.interface_id for path in paths.values() if path.interface_id}
+        ).values_list("pk", "device__name", "name")
+    }
+
+    rows = []
+    for circuit in circuits:
+        term_a = terminations.get((circuit["pk"], "A"), {})
+        term_z = terminations.get((circuit["pk"], "Z"), {})
+        path_a = paths.get((circuit["pk"], "A"))
+        panels_a = _panels(path_a, rear_ports, positions)
+        p2p = bool(term_a.get("site__name") and term_z.get("site__name"))
+        meet_me = not p2p and len(panels_a) > 1
+
+        if p2p:
+            script_type = "P2P Circuit"
+        elif meet_me:
+            script_type = "MeetMe Circuit"
+        else:
+            script_type = "Standard Circuit"
+
+        custom_fields = circuit["custom_field_data"] or {}
+        row = {
+            "cid": circuit["cid"],
+            "description": circuit["description"],
+            "bun": custom_fields.get("bun") or "",
+            "provider": circuit["provider__name"],
+            "circuit_type": circuit["type__name"],
+            "side_a_site": term_a.get("site__name") or "",
+            "side_z_site": (term_z.get("site__name") or "") if p2p else "",
+            "side_z_providernetwork": "" if p2p else term_z.get("provider_network__name") or "",
+            "cir": circuit["commit_rate"] or "",
+            "install_date": circuit["install_date"].isoformat() if circuit["install_date"] else "",
+            "review": _bool(custom_fields.get("review")),
+            "comments": circuit["comments"],
+            "allow_skip": _bool(False),
+            "overwrite": _bool(True),
+            "nice_script_type": script_type,
+        }
+        row |= _side_columns("", term_a, path_a, panels_a[-1:], interfaces)
+        if p2p:
+            path_z = paths.get((circuit["pk"], "Z"))
+            row |= _side_columns("z_", term_z, path_z, _panels(path_z, rear_ports, positions)[-1:], interfaces)
+        if meet_me:
+            mm_pp, mm_pp_port, mm_description, _ = panels_a[0]
+            row |= {"mm_pp": mm_pp, "mm_pp_port": mm_pp_port, "mm_pp_port_description": mm_description}
+
+        rows.append({column: row.get(column, "") for column in HEADER_MAPPING.values()})
+
+    return rows
+
+
+def _panels(path, rear_ports: dict, positions: dict) -> list[tuple[str, str, str, int]]:
+    """
+    Patch Panels (device, RearPort, description, FrontPort position) from the termination towards the device:
+    [Meet Me Patch Panel,] Patch Panel
+    """
+    if not path:
+        return []
+    # The path crosses each panel as a (RearPort, FrontPort) pair
+    return [
+        (*rear_ports.get(rear_port, ("", "", "")), positions.get(front_port, 1))
+        for (_, rear_port), (_, front_port) in zip(path.ports[::2], path.ports[1::2])
+    ]
+
+
+def _side_columns(prefix: str, termination: dict, path, panels: list, interfaces: dict) -> dict:
+    """Columns of one side: termination details, Patch Panel (closest to the device) & device Interface"""
+    device, interface = interfaces.get(path.interface_id, ("", "")) if path else ("", "")
+    pp, pp_port, pp_port_description, pp_port_position = panels[0] if panels else ("", "", "", "")
+    columns = {
+        f"{prefix}pp": pp,
+        f"{prefix}pp_port": pp_port,
+        f"{prefix}pp_port_position": pp_port_position,
+        f"{prefix}pp_port_description": pp_port_description,
+        f"{prefix}pp_info": termination.get("pp_info") or "",
+        f"{prefix}xconnect_id": termination.get("xconnect_id") or "",
+        f"{prefix}device": device,
+        f"{prefix}interface": interface,
+        f"{prefix}direct_to_device": _bool(path is not None and not panels and path.interface_id),
+        f"{prefix}create_pp_port": _bool(False),
+    }
+    if not prefix:
+        columns |= {
+            "port_speed": termination.get("port_speed") or "",
+            "upstream_speed": termination.get("upstream_speed") or "",
+        }
+    return columns
+
+
+def iter_circuit_rows(circuits=None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Stream circuits as import rows (HEADER_MAPPING names, see NiceBulkCircuits.load_rows), chunk by chunk
+
+    circuits: Circuit queryset to export, defaults to all circuits
+    """
+    circuits = Circuit.objects.all() if circuits is None else circuits
+    circuit_ids = circuits.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+    for chunk in utils.chunks(circuit_ids, chunk_size):
+        yield from _export_chunk(chunk)
+
+
+def iter_circuits_csv(circuits=None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Stream circuits as CSV lines (header first), in the Bulk Circuits import format
+    """
+    headers = {column: header for header, column in HEADER_MAPPING.items()}
+    writer = csv.DictWriter(_Echo(), fieldnames=list(HEADER_MAPPING.values()))
+    yield writer.writerow(headers)
+    for row in iter_circuit_rows(circuits, chunk_size):
+        yield writer.writerow(row)
@@ -58,7 +58,7 @@ pp_port = ObjectVar(model=RearPort, label="Patch Panel Port", required=False, qu
 pp_port_description = StringVar(label="Patch Panel Port Description", required=False)
 pp_new_port = IntegerVar(
     label="CREATE Patch Panel Port #:",
-    description="Will be 'Front# and Back#, Enable creation via check box below.",
+    description="Will be 'Front# and Back#, Enable creation via check box below. Leave empty for the next free port.",
     min_value=0,
     max_value=48,
     required=False,
@@ -85,9 +85,21 @@ direct_to_device = BooleanVar(
 )
 create_pp_port = BooleanVar(
     label="Create Patch Panel Interface?",
-    description="Enter Patch Panel # in field above",
+    description="Enter Patch Panel # in field above (empty: next free port)",
     default=False,
 )
+pp_port_position = IntegerVar(
+    label="Patch Panel Port Position",
+    description="FrontPort position, for a multi-position Patch Panel Port (cassette). Default: 1",
+    min_value=1,
+    required=False,
+)
+pp_port_positions = IntegerVar(
+    label="New Patch Panel Port Positions",
+    description="Above 1, the new Patch Panel Port is a cassette (one FrontPort per position). Default: 1",
+    min_value=1,
+    required=False,
+)
 
 # Other
 port_speed = IntegerVar(
@@ -126,7 +138,7 @@ z_pp_port = ObjectVar(
 z_pp_port_description = StringVar(label="Patch Panel Z Port Description", required=False)
 z_pp_new_port = IntegerVar(
     label="CREATE Patch Panel Z Port #:",
-    description="Will be 'Front# and Back#, Enable creation via check box below.",
+    description="Will be 'Front# and Back#, Enable creation via check box below. Leave empty for the next free port.",
     min_value=0,
     max_value=48,
     required=False,
@@ -153,9 +165,21 @@ z_direct_to_device = BooleanVar(
 )
 z_create_pp_port = BooleanVar(
     label="Create Patch Panel (Z Side) Interface?",
-    description="Enter Patch Panel # in field above",
+    description="Enter Patch Panel # in field above (empty: next free port)",
     default=False,
 )
+z_pp_port_position = IntegerVar(
+    label="Patch Panel Z Port Position",
+    description="FrontPort position, for a multi-position Patch Panel Port (cassette). Default: 1",
+    min_value=1,
+    required=False,
+)
+z_pp_port_positions = IntegerVar(
+    label="New Patch Panel Z Port Positions",
+    description="Above 1, the new Patch Panel Port is a cassette (one FrontPort per position). Default: 1",
+    min_value=1,
+    required=False,
+)
 
 # Bulk Circuits
 bulk_circuits = FileVar(
@@ -167,6 +191,22 @@ circuit_num = IntegerVar(label="CSV Line Number", required=False)
 overwrite = BooleanVar(
     description="Overwrite existing circuits? (same Circuit ID & Provider == Same Circuit)", default=False
 )
+skip_unchanged = BooleanVar(
+    label="Skip unchanged circuits?",
+    description="With overwrites, skip rows unchanged since the last import (requires the 'import_hash' custom field)",
+    default=False,
+)
+fan_out_jobs = IntegerVar(
+    label="Background jobs",
+    description="Split the CSV by site into this many background jobs (large imports, requires commit)",
+    min_value=0,
+    required=False,
+)
+plan_only = BooleanVar(
+    label="Plan only (dry run)",
+    description="Run the import and roll it back, displaying the planned changes: nothing is kept",
+    default=False,
+)
 
 
 ## CSV Headers mapped to display fields (Also used as NiceCircuit attributes)
@@ -191,6 +231,8 @@ HEADER_MAPPING = {
     "Interface": "interface",
     "Cable Direct To Device": "direct_to_device",
     "Create PP Port": "create_pp_port",
+    "PP Port Position": "pp_port_position",
+    "PP New Port Positions": "pp_port_positions",
     # Other
     "Port Speed (Kbps)": "port_speed",
     "Upload Speed (Kbps)": "upstream_speed",
@@ -209,6 +251,8 @@ HEADER_MAPPING = {
     "Interface Z": "z_interface",
     "Cable Z Direct To Device": "z_direct_to_device",
     "Create PP Z Port": "z_create_pp_port",
+    "PP Z Port Position": "z_pp_port_position",
+    "PP Z New Port Positions": "z_pp_port_positions",
     # Misc
     "Allow Skip": "allow_skip",
     "Overwrite": "overwrite",
@@ -222,4 +266,11 @@ HEADER_MAPPING = {
 }
 
 # Custom variables that should be kept private (update these per install)
-customs = {"bun_root_path": "X:\\My Test\\Path"}
+customs = {
+    "bun_root_path": "X:\\My Test\\Path",
+    # Keep the name -> id maps of providers, circuit types, sites & devices in the Django cache between runs
+    "reference_cache": False,
+    # Background bulk import jobs (see fan_out_jobs): seconds a job may run, seconds its result is kept
+    "fan_out_job_timeout": 60 * 60,
+    "fan_out_result_ttl": 7 * 24 * 60 * 60,
+}
@@ -0,0 +1,147 @@
+#
+# Headless BulkCircuits, installed into netbox/extras/management/commands/ (see the Makefile)
+#
+# python manage.py nice_bulk_circuits /path/to/circuits.csv --overwrite --batch-size 200 --workers 4
+#
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from local.nice_circuits import NiceBulkCircuits
+from local.utils import BulkCheckpoint, ScriptLogger, iter_data_from_csv, rows_hash
+
+
+class Progress:
+    """Thread safe row counters, reported as JSON lines (one per batch)"""
+
+    def __init__(self, write):
+        self.write = write
+        self.lock = Lock()
+        self.start = time.monotonic()
+        self.counts = {"done": 0, "succeeded": 0, "failed": 0, "resumed": 0}
+
+    def add(self, **counts) -> None:
+        with self.lock:
+            for name, count in counts.items():
+                self.counts[name] += count
+            self.report("progress")
+
+    def report(self, event: str) -> None:
+        elapsed = time.monotonic() - self.start
+        rate = self.counts["done"] / elapsed if elapsed else 0
+        self.write(
+            json.dumps({"event": event, **self.counts, "elapsed": round(elapsed, 1), "rows_per_sec": round(rate, 1)})
+        )
+
+
+class Command(BaseCommand):
+    help = "Provision circuits in bulk from a CSV file (same format as the Bulk Circuits script)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("filename", help="CSV file to import")
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Overwrite existing circuits (same Circuit ID & Provider == Same Circuit)",
+        )
+        parser.add_argument(
+            "--skip-unchanged",
+            action="store_true",
+            help="With overwrites, skip rows unchanged since the last import",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Rows per transaction, progress is checkpointed after each batch (default: 100)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Import in parallel, rows are partitioned by site so workers never share a patch panel",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint from a previous run")
+
+    def handle(self, *args, **options):
+        log = logging.getLogger("netbox.scripts.nice_circuits")
+        if not log.handlers:
+            handler = logging.StreamHandler(self.stderr)
+            handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+            log.addHandler(handler)
+        log.setLevel({0: logging.ERROR, 1: logging.WARNING}.get(options["verbosity"], logging.INFO))
+
+        # First pass streams the file for its content hash (checkpoint key)
+        file_hash = rows_hash(enumerate(iter_data_from_csv(options["filename"]), start=1))
+        progress = Progress(self.stdout.write)
+
+        if options["workers"] > 1:
+            rows = list(enumerate(iter_data_from_csv(options["filename"]), start=1))
+            partitions = NiceBulkCircuits.partition_rows_by_site(rows, options["workers"])
+            del rows
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                futures = [
+                    executor.submit(self.import_rows, partition, f"{file_hash}:{index}", progress, options)
+                    for index, partition in enumerate(partitions)
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            rows = enumerate(iter_data_from_csv(options["filename"]), start=1)
+            self.import_rows(rows, file_hash, progress, options)
+
+        progress.report("done")
+
+    def import_rows(self, rows, checkpoint_key: str, progress: Progress, options: dict) -> None:
+        """Stage & create numbered rows batch by batch, committing (and checkpointing) after each batch"""
+        logger = ScriptLogger()
+        checkpoint = BulkCheckpoint(
+            checkpoint_key,
+            interval=options["batch_size"],
+            overwrite=options["overwrite"],
+            skip_unchanged=options["skip_unchanged"],
+        )
+        if options["restart"]:
+            checkpoint.clear()
+        resume_after = checkpoint.load()
+
+        try:
+            batch = []
+            resumed = 0
+            for row_num, row in rows:
+                if row_num <= resume_after:
+                    resumed += 1
+                    continue
+                batch.append((row_num, row))
+                if len(batch) >= options["batch_size"]:
+                    self.import_batch(logger, batch, checkpoint, progress, options)
+                    batch = []
+            if batch:
+                self.import_batch(logger, batch, checkpoint, progress, options)
+            if resumed:
+                progress.add(resumed=resumed)
+            checkpoint.clear()
+        finally:
+            # Worker threads each have their own DB connection
+            connections.close_all()
+
+    def import_batch(self, logger, batch: list, checkpoint: BulkCheckpoint, progress: Progress, options: dict):
+        """Import one batch in a single transaction, a failing row only rolls back itself"""
+        with transaction.atomic():
+            # The whole batch at once: one port index for its "next" Patch Panel Ports
+            staged = NiceBulkCircuits.stage_rows(logger, batch, overwrite=options["overwrite"], isolate_rows=True)
+            failed = len(batch) - len(staged)
+
+            results = NiceBulkCircuits.create_circuits(
+                logger, staged, skip_unchanged=options["skip_unchanged"], isolate_rows=True
+            )
+            failed += sum(1 for result in results.values() if not result["result"])
+
+        # Committed, safe to checkpoint
+        checkpoint.update(batch[-1][0])
+        checkpoint.save()
+        progress.add(done=len(batch), succeeded=len(batch) - failed, failed=failed)
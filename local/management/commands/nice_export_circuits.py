@@ -0,0 +1,35 @@
+#
+# Export circuits in the Bulk Circuits CSV format, installed into netbox/extras/management/commands/ (see the Makefile)
+#
+# python manage.py nice_export_circuits --site site-1 --output /path/to/circuits.csv
+#
+from circuits.models import Circuit
+from django.core.management.base import BaseCommand
+from local.circuit_export import EXPORT_CHUNK_SIZE, iter_circuits_csv
+
+
+class Command(BaseCommand):
+    help = "Export circuits as a CSV, re-importable with the Bulk Circuits script (or nice_bulk_circuits)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", action="append", default=[], help="Site slug (repeat for several sites)")
+        parser.add_argument("--output", help="CSV file to write (default: stdout)")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f"Circuits loaded per batch of queries (default: {EXPORT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        circuits = Circuit.objects.all()
+        if options["site"]:
+            circuits = circuits.filter(terminations__site__slug__in=options["site"]).distinct()
+
+        lines = iter_circuits_csv(circuits, chunk_size=options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="") as csv_file:
+                csv_file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -1,7 +1,11 @@
-import inspect
+import functools
+import hashlib
+import json
+from contextlib import nullcontext
 from dataclasses import dataclass, fields
 
 import local.utils as utils
+from local.bulk_planner import find_cable_conflicts
 from circuits.choices import CircuitStatusChoices
 from circuits.models import (
     Circuit,
@@ -12,7 +16,8 @@ from circuits.models import (
 )
 from dcim.choices import CableTypeChoices, PortTypeChoices
 from dcim.models import Cable, Device, FrontPort, Interface, RearPort, Site
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from extras.scripts import Script
 from utilities.choices import ColorChoices
 from utilities.exceptions import AbortScript
@@ -42,6 +47,8 @@ class NiceCircuit:
     interface: Interface
     direct_to_device: bool
     create_pp_port: bool
+    pp_port_position: int = 1  # FrontPort position on a multi-position (cassette) RearPort
+    pp_port_positions: int = 1  # Positions of a new Patch Panel Port (cassette if above 1)
     # Other
     port_speed: int
     upstream_speed: int
@@ -52,17 +59,23 @@ class NiceCircuit:
     # Misc
     allow_skip: bool = False
     overwrite: bool = False
-    from_csv: bool = False
     circuit: Circuit = None
     side_z_providernetwork: ProviderNetwork = ""
+    # Netbox objects shared with the other circuits of the run (see StagedCircuit.hydrate)
+    identity_map: utils.IdentityMap = None
 
     def __post_init__(self, **kwargs) -> None:
         # For now - always defaulted to LC & Yellow
         self.pp_port_type = PortTypeChoices.TYPE_LC
         self.cable_color = ColorChoices.COLOR_YELLOW
+        # Terminations of the circuit being overwritten, by term_side (see create_circuit)
+        self.existing_terminations = {}
+        # Existing terminations left as is, by term_side (nothing to save)
+        self.unchanged_terminations = set()
+        # Next free Patch Panel ports, for "Create Patch Panel Port" without a port number
+        self.port_index = utils.FreePortIndex()
+        self.identity_map = self.identity_map or utils.IdentityMap()
         """Validate/Set initial data properly"""
-        if self.from_csv:
-            NiceCircuit._prepare_circuit_from_csv(self)
         self._validate_data()
         self._set_custom_fields()
 
@@ -75,40 +88,7 @@ class NiceCircuit:
             "review": self.review,
         }
 
-    def _prepare_circuit_from_csv(self) -> None:
-        """
-        Used to prepare the required data as netbox objects, if it was initially loaded from a CSV
-        """
-
-        # Fix bools
-        for field in [
-            "direct_to_device",
-            "allow_skip",
-            "review",
-            "overwrite",
-            "create_pp_port",
-        ]:
-            value = getattr(self, field)
-            setattr(self, field, utils.fix_bools(value))
-
-        self.bun = self.bun if utils.is_four_digit_numeric(self.bun) else ""
-        self.cir = self.cir or 0
-        self.port_speed = self.port_speed or 0
-        self.upstream_speed = self.upstream_speed or 0
-        self.provider = utils.get_provider_by_name(self.provider)
-        self.circuit_type = utils.get_circuit_type_by_name(name=self.circuit_type)
-        self.side_a_site = utils.get_site_by_name(self.side_a_site)
-        self.side_z_providernetwork = utils.get_provider_network_by_name(self.side_z_providernetwork)
-        self.device = utils.get_device_by_name(name=self.device, site=self.side_a_site)
-        self.interface = utils.get_interface_by_name(name=self.interface, device=self.device)
-        self.pp = utils.get_device_by_name(name=self.pp, site=self.side_a_site)
-        self.pp_port = utils.get_rearport_by_name(name=self.pp_port, device=self.pp)
-        self.pp_new_port = utils.validate_pp_new_port(
-            port_num=self.pp_new_port, logger=self.logger, skip=self.allow_skip
-        )
-        self.install_date = utils.validate_date(self.install_date)
-
-    def create_new_pp_port(self, pp: Device, port_num: int, description: str) -> None:
+    def create_new_pp_port(self, pp: Device, port_num: int, description: str, positions: int = 1) -> None:
         """
         Create a new Patch Panel Port (Rear & Front)
 
@@ -116,43 +96,65 @@ class NiceCircuit:
             pp: netbox Device
             port_num: Integer for the new port number
             descriptin: description
+            positions: Above 1, a cassette: one RearPort with a FrontPort per position (Front{port_num}-{position})
         """
         error = False
 
-        rps = RearPort.objects.filter(device=pp)
-        for rp in rps:
-            if f"Rear{port_num}" in rp.name:
-                error = f"Patch Panel RearPort {pp}/{port_num} already exists! Skipping."
-
-        fps = FrontPort.objects.filter(device=pp)
-        for fp in fps:
-            if f"Front{port_num}" in fp.name:
-                error = f"Patch Panel FrontPort {pp}/{port_num} already exists! Skipping."
+        if pp.rearports.filter(name=f"Rear{port_num}").exists():
+            error = f"Patch Panel RearPort {pp}/{port_num} already exists! Skipping."
+        if pp.frontports.filter(name=f"Front{port_num}").exists():
+            error = f"Patch Panel FrontPort {pp}/{port_num} already exists! Skipping."
         if error:
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
 
         # refactor all this into self?
         pp_rearport = utils.create_rearport(
-            name=f"Rear{port_num}", type=self.pp_port_type, pp=pp, description=description
+            name=f"Rear{port_num}", type=self.pp_port_type, pp=pp, description=description, positions=positions
         )
         if not pp_rearport:
             return
 
-        utils.save_rearport(self.logger, pp_rearport)
+        if positions > 1:
+            try:
+                with transaction.atomic():
+                    utils.save_rearport(self.logger, pp_rearport)
+                    utils.create_cassette_frontports(
+                        self.logger, pp_rearport, port_num, type=self.pp_port_type, description=description
+                    )
+            except ValidationError as e:
+                error = f"CID '{self.cid}': Unable to create Patch Panel cassette {pp}/Rear{port_num}: {e.messages}"
+                utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
+                return
+        else:
+            utils.save_rearport(self.logger, pp_rearport)
 
-        pp_frontport = utils.create_frontport(
-            name=f"Front{port_num}", type=self.pp_port_type, pp=pp, rear_port=pp_rearport, description=description
-        )
-        if not pp_frontport:
-            return
+            pp_frontport = utils.create_frontport(
+                name=f"Front{port_num}", type=self.pp_port_type, pp=pp, rear_port=pp_rearport, description=description
+            )
+            if not pp_frontport:
+                return
+
+            utils.save_frontport(self.logger, pp_frontport)
 
-        utils.save_frontport(self.logger, pp_frontport)
         utils.create_extra_pp_ports(
             port_num=port_num, type=self.pp_port_type, pp=pp, logger=self.logger, allow_skip=self.allow_skip
         )
+        self.identity_map.forget_frontports(pp.pk)
 
         return pp_rearport
 
+    def next_pp_port(self, pp: Device) -> int | None:
+        """
+        Allocate the next free port number of a Patch Panel (see utils.FreePortIndex)
+        """
+        port_num = self.port_index.allocate(pp.pk, pp.site_id)
+        if port_num is None:
+            error = f"CID '{self.cid}': No free Patch Panel Port left on {pp} (maximum: {utils.MAX_PP_PORT})"
+            utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
+        else:
+            self.logger.log_info(f"\tCID '{self.cid}': Next free Patch Panel Port on {pp}: {port_num}")
+        return port_num
+
     def _init_patch_panel_properties(self) -> None:
         """
         Initialize any Patch Panel Properties
@@ -167,9 +169,13 @@ class NiceCircuit:
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
             return False
 
-        # Create Patch Panel Port?
-        if self.pp_new_port and self.create_pp_port:
-            self.pp_port = self.create_new_pp_port(self.pp, self.pp_new_port, self.pp_port_description)
+        # Create Patch Panel Port? (no port number: the panel's next free port)
+        if self.create_pp_port and not self.pp_new_port and not self.pp_port and self.pp:
+            self.pp_new_port = self.next_pp_port(self.pp)
+        if self.pp_new_port and self.create_pp_port and self.pp:
+            self.pp_port = self.create_new_pp_port(
+                self.pp, self.pp_new_port, self.pp_port_description, positions=self.pp_port_positions
+            )
 
         valid = self._validate_x_cables(
             self.pp,
@@ -183,6 +189,8 @@ class NiceCircuit:
 
     def _validate_data(self) -> None:
         """Validate things"""
+        self.pp_port_position = self.pp_port_position or 1
+        self.pp_port_positions = self.pp_port_positions or 1
         # Validate we have enough information for a circuit
         if not all([self.cid, self.provider, self.circuit_type]):
             error = (
@@ -205,15 +213,12 @@ class NiceCircuit:
         xconnect_id = self.xconnect_id if side == "A" else getattr(self, "z_xconnect_id", "")
         pp_info = self.pp_info if side == "A" else getattr(self, "z_pp_info", "")
         termination = None
-        existing = self.circuit.terminations.all()
-        if len(existing) > 0:
-            for term in existing:
-                if term.term_side == side.upper():
-                    if term.site != site:
-                        return f"CID {self.cid}: Cannot change existing termination{side.upper()} to new Site"
-                    else:
-                        if self.overwrite:
-                            termination = term
+        existing = self.existing_terminations.get(side.upper())
+        if existing:
+            if existing.site_id != site.pk:
+                return f"CID {self.cid}: Cannot change existing termination{side.upper()} to new Site"
+            elif self.overwrite:
+                termination = existing
         if not termination:
             termination = CircuitTermination(
                 term_side=side.upper(),
@@ -225,10 +230,15 @@ class NiceCircuit:
                 pp_info=pp_info,
             )
         else:
-            termination.port_speed = self.port_speed
-            termination.upstream_speed = self.upstream_speed
-            termination.xconnect_id = xconnect_id
-            termination.pp_info = pp_info
+            changed = utils.update_changed_fields(
+                termination,
+                port_speed=self.port_speed,
+                upstream_speed=self.upstream_speed,
+                xconnect_id=xconnect_id,
+                pp_info=pp_info,
+            )
+            if not changed:
+                self.unchanged_terminations.add(side.upper())
 
         return termination
 
@@ -251,7 +261,11 @@ class NiceCircuit:
                 utils.handle_errors(self.logger.log_warning, error, self.allow_skip)
                 return None
 
-            utils.save_terminations(logger=self.logger, termination=termination_x)
+            utils.save_terminations(
+                logger=self.logger,
+                termination=termination_x,
+                changed=side.upper() not in self.unchanged_terminations,
+            )
         else:
             error = f"CID '{self.cid}': Missing Site for Termination {side}"
             utils.handle_errors(self.logger.log_warning, error, self.allow_skip)
@@ -274,15 +288,12 @@ class NiceCircuit:
         pp_info = self.pp_info if side == "A" else getattr(self, "z_pp_info", "")
 
         termination: CircuitTermination = None
-        existing = self.circuit.terminations.all()
-        if len(existing) > 0:
-            for term in existing:
-                if term.term_side == side.upper():
-                    if term.provider_network != provider_network:
-                        return f"CID {self.cid}: Cannot change existing termination {side.upper()} to new Provider"
-                    else:
-                        if self.overwrite:
-                            termination = term
+        existing = self.existing_terminations.get(side.upper())
+        if existing:
+            if existing.provider_network_id != provider_network.pk:
+                return f"CID {self.cid}: Cannot change existing termination {side.upper()} to new Provider"
+            elif self.overwrite:
+                termination = existing
         if not termination:
             termination = CircuitTermination(
                 term_side=side.upper(),
@@ -294,10 +305,15 @@ class NiceCircuit:
                 pp_info=pp_info,
             )
         else:
-            termination.port_speed = self.port_speed
-            termination.upstream_speed = self.upstream_speed
-            # termination.xconnect_id = self.xconnect_id
-            termination.pp_info = pp_info
+            changed = utils.update_changed_fields(
+                termination,
+                port_speed=self.port_speed,
+                upstream_speed=self.upstream_speed,
+                # xconnect_id=self.xconnect_id,
+                pp_info=pp_info,
+            )
+            if not changed:
+                self.unchanged_terminations.add(side.upper())
 
         return termination
 
@@ -319,7 +335,11 @@ class NiceCircuit:
                 error = termination_x
                 utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
                 return None
-            utils.save_terminations(logger=self.logger, termination=termination_x)
+            utils.save_terminations(
+                logger=self.logger,
+                termination=termination_x,
+                changed=side.upper() not in self.unchanged_terminations,
+            )
         else:
             error = f"CID '{self.cid}': Missing Provider Network for Termination {side.upper()}"
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
@@ -342,34 +362,44 @@ class NiceCircuit:
             custom_field_data=self.custom_fields,
         )
 
-    def _update_circuit(self, circuit: Circuit) -> Circuit:
-        """Update existing Circuit attributes"""
-        circuit.type = self.circuit_type
-        circuit.status = CircuitStatusChoices.STATUS_ACTIVE
-        circuit.description = self.description
-        circuit.commit_rate = self.cir
-        circuit.install_date = self.install_date
-        circuit.custom_field_data = self.custom_fields
-        return circuit
+    def _update_circuit(self, circuit: Circuit) -> list[str]:
+        """
+        Update existing Circuit attributes (only those that changed, snapshot first)
 
-    def get_frontport(self, rear_port) -> FrontPort:
+        Returns:
+            The changed attributes
+        """
+        return utils.update_changed_fields(
+            circuit,
+            type=self.circuit_type,
+            status=CircuitStatusChoices.STATUS_ACTIVE,
+            description=self.description,
+            commit_rate=self.cir,
+            install_date=self.install_date,
+            # Keep any other custom field (e.g. import_hash)
+            custom_field_data={**circuit.custom_field_data, **self.custom_fields},
+        )
+
+    def get_frontport(self, rear_port, position: int = 1) -> FrontPort:
         """
         Get FrontPort associated with RearPort
 
         Args:
             rear_port: The RearPort
+            position: The FrontPort position, for RearPorts with multiple positions (cassettes)
 
         Returns:
             A netbox FrontPort object
         """
         if not isinstance(rear_port, RearPort):
             return None
-        if self.pp_port.positions > 1:
-            raise AbortScript(
-                f"RearPorts with multiple positions not yet implemented: Device/RearPort: {rear_port.device.name} / {rear_port}"
-            )
 
-        return rear_port.frontports.first()
+        # Every FrontPort of the panel resolved at once, and shared by the circuits of the run
+        front_port = self.identity_map.frontport_map(rear_port.device_id).get((rear_port.pk, position))
+        if not front_port:
+            error = f"CID '{self.cid}': No FrontPort at position {position} of {rear_port.device.name} / {rear_port}"
+            utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
+        return front_port
 
     def _validate_x_cables(
         self,
@@ -402,11 +432,7 @@ class NiceCircuit:
             )
         elif not direct_to_device and (pp is None or pp_port is None):
             error = f"\tCID '{self.cid}': Error: Patch Panel or port {pp}/{pp_port} missing, and 'Cable Direct to Device' is not checked."
-        # Update Description
-        elif isinstance(pp, Device):
-            if not pp_port.description and pp_port_description:
-                pp_port.description = pp_port_description
-                self.get_frontport(pp_port).description = pp_port_description
+        # Port descriptions are updated (only if changed) by create_standard_cables
 
         if error:
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
@@ -429,13 +455,17 @@ class NiceCircuit:
             a_side: The OTHER side of this cable, either a FrontPort or Circuit Termination
 
         Returns:
-            A netbox Cable object
+            A netbox Cable object, None if both sides are already cabled together (overwrite of a cabled circuit)
         """
         if not device_or_pp or not interface_or_pp_port:
             error = f"CID '{self.cid}': Unable to create cable to the device for circuit: {self.cid}"
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
             return
 
+        if a_side and a_side.cable_id and a_side.cable_id == interface_or_pp_port.cable_id:
+            self.logger.log_info(f"\tCable {a_side} <-> {device_or_pp} / {interface_or_pp_port} unchanged, skipping")
+            return
+
         if isinstance(a_side, CircuitTermination):
             label = f"({a_side}) <-> ({device_or_pp} / {interface_or_pp_port})"
         elif isinstance(a_side, FrontPort):
@@ -460,42 +490,60 @@ class NiceCircuit:
         interface: Interface,
         termination: CircuitTermination,
         direct_to_device: bool,
+        pp_port_position: int = 1,
     ) -> None:
         """
         Creates and saves 'standard' cables for most circuit use cases
+
+        pp_port_position: FrontPort position, for a multi-position Patch Panel Port (cassette)
         """
         if direct_to_device:
             pp_cable = None
             device_side_a = termination
         else:
             pp_cable = self._build_device_or_pp_cable(pp, pp_port, a_side=termination)
-            device_side_a = self.get_frontport(pp_port)
-            if device_side_a:
-                pp_port.description = pp_port_description if pp_port_description else pp_port.description
-                pp_port.full_clean()
-                pp_port.save()
+            if pp_cable and pp_port.cable_id:
+                # Cabled to something else, cassettes included: a RearPort (trunk) serves a single termination
+                error = f"CID '{self.cid}': Patch Panel Port {pp}/{pp_port} already has a Cable"
+                utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
+                return
+            device_side_a = self.get_frontport(pp_port, pp_port_position)
+            if device_side_a and pp_port_description:
+                # Rear & Front Port share the description, only save what changed
+                for port in (pp_port, device_side_a):
+                    if utils.update_changed_fields(port, description=pp_port_description):
+                        port.full_clean()
+                        port.save()
 
         device_cable = self._build_device_or_pp_cable(device, interface, a_side=device_side_a)
 
-        return utils.save_cables(logger=self.logger, allow_skip=self.allow_skip, cables=[pp_cable, device_cable])
+        return self.save_cables([pp_cable, device_cable])
+
+    def save_cables(self, cables: list) -> str | None:
+        """Save the cables (see utils.save_cables), and refresh the cable of the ports shared with the other rows"""
+        success = utils.save_cables(logger=self.logger, allow_skip=self.allow_skip, cables=cables)
+        self.identity_map.refresh_cables(cables)
+        return success
 
     def create_circuit(self) -> Circuit:
         """
         Create & Save Netbox Circuit
         """
-        duplicate = utils.check_circuit_duplicate(self.cid, self.provider)
-        if not duplicate:
+        # Existing circuit, with its terminations & cables (one prefetch, used by the termination builders)
+        existing = utils.get_existing_circuit(self.cid, self.provider)
+        if not existing:
             circuit = self._build_circuit()
-        elif duplicate and self.overwrite:
+        elif existing and self.overwrite:
             self.logger.log_warning(
                 f"CID '{self.cid}': Overwrites enabled, updating existing circuit! See change log for original values."
             )
-            # Updating existing circuit, create snapshot (change log)
-            circuit = Circuit.objects.get(cid=self.cid, provider__name=self.provider)
-            if circuit.pk and hasattr(circuit, "snapshot"):
-                circuit.snapshot()
+            self.existing_terminations = {term.term_side: term for term in existing.terminations.all()}
 
-            circuit = self._update_circuit(circuit)
+            # Updating existing circuit (snapshot & save only if anything changed)
+            circuit = existing
+            if not self._update_circuit(circuit):
+                self.logger.log_info(f"\tCircuit '{self.cid}' unchanged, skipping save")
+                return circuit
         else:
             error = f"CID '{self.cid}': Error, existing Circuit found!"
             circuit = None
@@ -508,66 +556,515 @@ class NiceCircuit:
         return circuit
 
 
+# Foreign keys held by a StagedCircuit as "<name>_id", hydrated back into netbox objects at write time
+STAGED_FOREIGN_KEYS = {
+    "provider": Provider,
+    "circuit_type": CircuitType,
+    "side_a_site": Site,
+    "side_z_site": Site,
+    "side_z_providernetwork": ProviderNetwork,
+    "pp": Device,
+    "pp_port": RearPort,
+    "device": Device,
+    "interface": Interface,
+    "z_pp": Device,
+    "z_pp_port": RearPort,
+    "z_device": Device,
+    "z_interface": Interface,
+    "mm_pp": Device,
+    "mm_pp_port": RearPort,
+}
+
+
+# StagedCircuit fields that don't change what a row writes
+STAGED_HASH_EXCLUDE = {"row_num", "allow_skip", "overwrite", "allocated_pp_ports"}
+
+
+@dataclass(slots=True, kw_only=True)
+class StagedCircuit:
+    """
+    Compact record of one bulk CSV row: normalized, with netbox objects resolved to primary keys only.
+    The full NiceCircuit is hydrated (one row at a time) when the row is actually written.
+    """
+
+    row_num: int
+    script_type: str
+    # Circuit
+    cid: str
+    description: str = ""
+    bun: str = ""
+    provider_id: int | None = None
+    circuit_type_id: int | None = None
+    side_a_site_id: int | None = None
+    side_z_site_id: int | None = None
+    side_z_providernetwork_id: int | None = None
+    # Cables (Side A)
+    pp_id: int | None = None
+    pp_port_id: int | None = None
+    pp_new_port: int | str = ""
+    pp_port_description: str = ""
+    pp_info: str = ""
+    xconnect_id: str = ""
+    device_id: int | None = None
+    interface_id: int | None = None
+    direct_to_device: bool = False
+    create_pp_port: bool = False
+    pp_port_position: int = 1
+    pp_port_positions: int = 1
+    # Other
+    port_speed: int = 0
+    upstream_speed: int = 0
+    cir: int = 0
+    install_date: str = ""
+    review: bool = False
+    comments: str = ""
+    # Cables (P2P Side Z)
+    z_pp_id: int | None = None
+    z_pp_port_id: int | None = None
+    z_pp_new_port: int | str = ""
+    z_pp_port_description: str = ""
+    z_pp_info: str = ""
+    z_xconnect_id: str = ""
+    z_device_id: int | None = None
+    z_interface_id: int | None = None
+    z_direct_to_device: bool = False
+    z_create_pp_port: bool = False
+    z_pp_port_position: int = 1
+    z_pp_port_positions: int = 1
+    # Meet Me
+    mm_pp_id: int | None = None
+    mm_pp_port_id: int | None = None
+    mm_pp_new_port: int | str = ""
+    mm_pp_port_description: str = ""
+    mm_create_pp_port: bool = False
+    # Misc
+    allow_skip: bool = False
+    overwrite: bool = False
+    # Sides ("" / "z_") whose new Patch Panel Port was allocated (see NiceBulkCircuits.allocate_pp_ports)
+    allocated_pp_ports: tuple[str, ...] = ()
+
+    @classmethod
+    def from_row(cls, row_num: int, row: dict, references: utils.ReferenceCache = None) -> "StagedCircuit":
+        """
+        Stage one CSV row, already normalized (see utils.normalize_columns), resolving its names to primary keys
+
+        references: Cached name -> id maps of the run (see utils.get_reference_cache)
+        """
+        script_type = row.get("nice_script_type")
+        p2p = script_type == "P2P Circuit"
+        meet_me = script_type == "MeetMe Circuit"
+
+        staged = cls(
+            row_num=row_num,
+            script_type=script_type,
+            cid=row.get("cid", ""),
+            description=row.get("description", ""),
+            bun=row["bun"],
+            pp_new_port=row["pp_new_port"],
+            pp_port_description=row.get("pp_port_description", ""),
+            pp_info=row.get("pp_info", ""),
+            xconnect_id=row.get("xconnect_id", ""),
+            port_speed=row["port_speed"],
+            upstream_speed=row["upstream_speed"],
+            cir=row["cir"],
+            install_date=row["install_date"],
+            comments=row.get("comments", ""),
+            pp_port_position=row["pp_port_position"],
+            pp_port_positions=row["pp_port_positions"],
+            **{column: row[column] for column in utils.BOOL_COLUMNS},
+        )
+
+        # Resolve netbox objects, by primary key only
+        get_pk = functools.partial(utils.get_pk_by_name, references=references)
+        staged.provider_id = get_pk(Provider, row.get("provider"))
+        staged.circuit_type_id = get_pk(CircuitType, row.get("circuit_type"))
+        staged.side_a_site_id = get_pk(Site, row.get("side_a_site"))
+        staged.side_z_providernetwork_id = get_pk(ProviderNetwork, row.get("side_z_providernetwork"))
+        staged.device_id = get_pk(Device, row.get("device"), site_id=staged.side_a_site_id)
+        staged.interface_id = get_pk(Interface, row.get("interface"), device_id=staged.device_id)
+        staged.pp_id = get_pk(Device, row.get("pp"), site_id=staged.side_a_site_id)
+        staged.pp_port_id = get_pk(RearPort, row.get("pp_port"), device_id=staged.pp_id)
+
+        if p2p:
+            staged.side_z_site_id = get_pk(Site, row.get("side_z_site"))
+            staged.z_device_id = get_pk(Device, row.get("z_device"), site_id=staged.side_z_site_id)
+            staged.z_interface_id = get_pk(Interface, row.get("z_interface"), device_id=staged.z_device_id)
+            staged.z_pp_id = get_pk(Device, row.get("z_pp"), site_id=staged.side_z_site_id)
+            staged.z_pp_port_id = get_pk(RearPort, row.get("z_pp_port"), device_id=staged.z_pp_id)
+            staged.z_pp_new_port = row["z_pp_new_port"]
+            staged.z_pp_port_description = row.get("z_pp_port_description", "")
+            staged.z_pp_info = row.get("z_pp_info", "")
+            staged.z_xconnect_id = row.get("z_xconnect_id", "")
+            staged.z_pp_port_position = row["z_pp_port_position"]
+            staged.z_pp_port_positions = row["z_pp_port_positions"]
+
+        if meet_me:
+            staged.mm_pp_id = get_pk(Device, row.get("mm_pp"), site_id=staged.side_a_site_id)
+            staged.mm_pp_port_id = get_pk(RearPort, row.get("mm_pp_port"), device_id=staged.mm_pp_id)
+            staged.mm_pp_new_port = row["mm_pp_new_port"]
+            staged.mm_pp_port_description = row.get("mm_pp_port_description", "")
+
+        if not all([staged.cid, staged.provider_id, staged.circuit_type_id]):
+            error = (
+                f"Missing/Not Found Mandatory Value for either: Circuit ID ({staged.cid}), "
+                f"Provider ({row.get('provider')}), or Circuit Type ({row.get('circuit_type')})"
+            )
+            raise AbortScript(error)
+
+        return staged
+
+    def cable_ports(self) -> list[tuple[str, int, int]]:
+        """
+        The existing ports this row will cable, as ("interface" | "rear_port", pk, position)
+        A Patch Panel RearPort is cabled on both sides (RearPort & its FrontPort at position)
+        """
+        sides = [(self.interface_id, self.pp_port_id, self.pp_port_position, self.direct_to_device)]
+        if self.script_type == "P2P Circuit":
+            sides.append((self.z_interface_id, self.z_pp_port_id, self.z_pp_port_position, self.z_direct_to_device))
+
+        ports = []
+        for interface_id, pp_port_id, position, direct_to_device in sides:
+            if interface_id:
+                ports.append(("interface", interface_id, 1))
+            if pp_port_id and not direct_to_device:
+                ports.append(("rear_port", pp_port_id, position))
+        if self.script_type == "MeetMe Circuit" and self.mm_pp_port_id:
+            ports.append(("rear_port", self.mm_pp_port_id, 1))
+
+        return ports
+
+    def hydrate(self, logger: Script, identity_map: utils.IdentityMap = None) -> "NiceCircuit":
+        """
+        Build the full NiceCircuit (with netbox objects) for this row, right before it is written
+
+        identity_map: Netbox objects of the run, shared by every row (see NiceBulkCircuits.load_identity_map)
+        """
+        circuit_cls = BULK_SCRIPT_TYPES[self.script_type]
+        identity_map = identity_map or utils.IdentityMap()
+        kwargs = {"logger": logger, "identity_map": identity_map}
+        for field in fields(circuit_cls):
+            if field.name in STAGED_FOREIGN_KEYS:
+                model = STAGED_FOREIGN_KEYS[field.name]
+                kwargs[field.name] = identity_map.get(model, getattr(self, f"{field.name}_id"))
+            elif field.name in self.__slots__:
+                kwargs[field.name] = getattr(self, field.name)
+
+        return circuit_cls(**kwargs)
+
+    def payload_hash(self) -> str:
+        """
+        Hash of the normalized row (what it would write), used to skip rows unchanged since the last import
+        """
+        payload = [(f.name, getattr(self, f.name)) for f in fields(self) if f.name not in STAGED_HASH_EXCLUDE]
+        # Allocated port numbers depend on the panel's current ports, hash what the row asked for
+        allocated = {f"{prefix}pp_new_port" for prefix in self.allocated_pp_ports}
+        payload = [(name, utils.NEXT_PP_PORT if name in allocated else value) for name, value in payload]
+        return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+
 class NiceBulkCircuits:
     """Entry point for loading a CSV of bulk circuits to create NiceCircuit obects"""
 
-    @classmethod
-    def from_csv(cls, logger: Script, overwrite: bool = False, filename="", circuit_num: int = 0):
+    @staticmethod
+    def load_rows(filename="", circuit_num: int = 0) -> list[tuple[int, dict]]:
         """
-        Load up circuits from a CSV
+        Load the CSV rows, numbered from 1 (excluding the header)
 
         circuit_num: Pull only one circuit out of the CSV (used extensively for tests)
         """
         csv_data = utils.load_data_from_csv(filename=filename)
-        circuits = []
 
         if circuit_num:
             try:
-                csv_data = [csv_data[circuit_num - 1]]  # 1 for header, 1 for zero indexing
+                return [(circuit_num, csv_data[circuit_num - 1])]  # 1 for header, 1 for zero indexing
             except IndexError:
                 raise AbortScript(f"Circuit {circuit_num} not found!, Only {len(csv_data)} rows found.")
 
-        for row in csv_data:
-            # Set initial values
-            row["logger"] = logger
-            row["from_csv"] = True
+        return list(enumerate(csv_data, start=1))
+
+    @classmethod
+    def stage_csv(
+        cls, logger: Script, overwrite: bool = False, filename="", circuit_num: int = 0
+    ) -> list[StagedCircuit]:
+        """
+        Load up circuits from a CSV as compact StagedCircuit records
+
+        circuit_num: Pull only one circuit out of the CSV (used extensively for tests)
+        """
+        rows = cls.load_rows(filename=filename, circuit_num=circuit_num)
+        return cls.stage_rows(logger=logger, rows=rows, overwrite=overwrite)
+
+    @staticmethod
+    def stage_rows(
+        logger: Script, rows: list[tuple[int, dict]], overwrite: bool = False, isolate_rows: bool = False
+    ) -> list[StagedCircuit]:
+        """
+        Stage numbered CSV rows (see load_rows) as compact StagedCircuit records
+
+        isolate_rows: Log & leave out the failing rows (the rows missing from the result), instead of aborting
+        """
+        failed = set()
+
+        def fail(row_num: int, error: str) -> None:
+            if not isolate_rows:
+                raise AbortScript(error)
+            logger.log_failure(f"Row {row_num}: {error}")
+            failed.add(row_num)
+
+        for row_num, row in rows:
             if overwrite:
                 row["overwrite"] = overwrite
-            elif row["overwrite"]:
-                row["overwrite"] = utils.fix_bools(row["overwrite"])
-
-            if row.get("nice_script_type") == "Standard Circuit":
-                del row["nice_script_type"]
-                try:
-                    circuits.append(NiceStandardCircuit._from_csv(**row))
-                except TypeError as e:
-                    error = "Malformed/Unsupported CSV Columns:\n"
-                    error += f"{row}"
-                    error += f"\n{e}\n"
-                    raise AbortScript(error)
-
-            elif row.get("nice_script_type") == "P2P Circuit":
-                del row["nice_script_type"]
-                try:
-                    circuits.append(NiceP2PCircuit._from_csv(**row))
-                except TypeError as e:
-                    error = "Malformed/Unsupported CSV Columns:\n"
-                    error += f"{row}"
-                    error += f"\n{e}\n"
-                    raise AbortScript(error)
-
-            elif row.get("nice_script_type") == "MeetMe Circuit":
-                del row["nice_script_type"]
-                try:
-                    circuits.append(NiceMeetMeCircuit._from_csv(**row))
-                except TypeError as e:
-                    error = "Malformed/Unsupported CSV Columns:\n"
-                    error += f"{row}"
-                    error += f"\n{e}\n"
-                    raise AbortScript(error)
+            if row.get("nice_script_type") not in BULK_SCRIPT_TYPES:
+                fail(row_num, f"Invalid Script Type: {row.get('nice_script_type')}")
+        rows = [(row_num, row) for row_num, row in rows if row_num not in failed]
+
+        # Normalize the whole file column by column, reporting every error at once
+        errors = utils.normalize_columns(rows)
+        if isolate_rows:
+            for row_num, error, skippable in errors:
+                if not skippable:
+                    fail(row_num, f"Invalid CSV value: {error}")
+            errors = [error for error in errors if error[2]]
+            rows = [(row_num, row) for row_num, row in rows if row_num not in failed]
+        if errors:
+            report = "\n".join(f"Row {row_num}: {error}" for row_num, error, _ in errors)
+            if not all(skippable for _, _, skippable in errors):
+                raise AbortScript(f"Invalid CSV values:\n{report}")
+            logger.log_failure(f"Invalid CSV values (Allow Skip):\n{report}")
+
+        references = utils.get_reference_cache()
+        staged_circuits = [StagedCircuit.from_row(row_num, row, references) for row_num, row in rows]
+        failed = NiceBulkCircuits.allocate_pp_ports(logger, staged_circuits, isolate_rows=isolate_rows)
+
+        return [staged for staged in staged_circuits if staged.row_num not in failed]
+
+    @staticmethod
+    def allocate_pp_ports(
+        logger: Script, staged_circuits: list[StagedCircuit], isolate_rows: bool = False
+    ) -> set[int]:
+        """
+        Resolve new Patch Panel Ports asking for the next free port ("next", or no number with "Create PP Port")
+        to port numbers, in row order, with one index for all the rows. Port numbers requested explicitly are
+        reserved first.
+
+        Returns:
+            The row numbers left without a port, with isolate_rows (else the run is aborted, unless Allow Skip)
+        """
+        index = utils.FreePortIndex()
+        failed = set()
+        sides = []
+        for staged in staged_circuits:
+            sides.append((staged, "", staged.pp_id, staged.side_a_site_id))
+            if staged.script_type == "P2P Circuit":
+                sides.append((staged, "z_", staged.z_pp_id, staged.side_z_site_id))
+
+        for staged, prefix, pp_id, site_id in sides:
+            port_num = getattr(staged, f"{prefix}pp_new_port")
+            if pp_id and isinstance(port_num, int) and port_num:
+                index.reserve(pp_id, site_id, port_num)
+
+        for staged, prefix, pp_id, site_id in sides:
+            port_num = getattr(staged, f"{prefix}pp_new_port")
+            create = getattr(staged, f"{prefix}create_pp_port")
+            existing_port = getattr(staged, f"{prefix}pp_port_id")
+            if port_num != utils.NEXT_PP_PORT and not (create and not port_num and not existing_port):
+                continue
+
+            setattr(staged, f"{prefix}pp_new_port", "")
+            if not pp_id or not create:
+                continue  # Reported when the row is created (missing Patch Panel / Create PP Port)
+            port_num = index.allocate(pp_id, site_id)
+            if port_num is None:
+                error = f"Row {staged.row_num}: CID '{staged.cid}': No free Patch Panel Port left ({utils.MAX_PP_PORT})"
+                if isolate_rows and not staged.allow_skip:
+                    logger.log_failure(error)
+                    failed.add(staged.row_num)
+                else:
+                    utils.handle_errors(logger.log_failure, error, staged.allow_skip)
+                continue
+            setattr(staged, f"{prefix}pp_new_port", port_num)
+            staged.allocated_pp_ports += (prefix,)
+            logger.log_info(f"Row {staged.row_num}: CID '{staged.cid}': Patch Panel Port {port_num} allocated")
+
+        return failed
+
+    @staticmethod
+    def create_circuits(
+        logger: Script,
+        staged_circuits: list[StagedCircuit],
+        checkpoint: utils.BulkCheckpoint = None,
+        skip_unchanged: bool = False,
+        isolate_rows: bool = False,
+        progress: utils.ProgressReporter = None,
+    ) -> dict:
+        """
+        Hydrate & create the staged circuits one row at a time
+
+        checkpoint: Skip the rows done by a previous run of the same file, and record progress for this one
+        skip_unchanged: Skip overwrites of circuits whose stored import hash matches the row
+            (requires the utils.IMPORT_HASH_FIELD custom field on Circuits)
+        isolate_rows: Roll back only the failing row (savepoint) and continue, instead of aborting the run
+            (AbortScript, and the ValidationError/IntegrityError of the netbox saves)
+        progress: Report the rows created as the "Creating" phase
+
+        Rows with cable conflicts (see bulk_planner.find_cable_conflicts) abort the run before any write,
+        unless they allow skipping (or isolate_rows), in which case only those rows are skipped.
+
+        Returns:
+            {row_num: {"cid": ..., "result": ..., "description": ...}} for each row created (or attempted)
+        """
+        resume_after = checkpoint.load() if checkpoint else 0
+        if resume_after:
+            logger.log_info(f"Resuming from checkpoint, skipping rows 1 - {resume_after} (already done).")
+
+        hashes = utils.has_custom_field(utils.IMPORT_HASH_FIELD, Circuit)
+        existing_hashes = {}
+        if skip_unchanged and hashes:
+            existing_hashes = utils.get_import_hashes({staged.cid for staged in staged_circuits})
+        elif skip_unchanged:
+            logger.log_warning(f"Custom field '{utils.IMPORT_HASH_FIELD}' not found, unable to skip unchanged rows.")
+
+        # Rows to write: not done by a previous run, nor unchanged since the last import
+        payload_hashes = {}
+        unchanged = set()
+        pending = []
+        for staged in staged_circuits:
+            if staged.row_num <= resume_after:
+                continue
+            payload_hash = payload_hashes[staged.row_num] = staged.payload_hash() if hashes else None
+            stored_hash = existing_hashes.get((staged.cid, staged.provider_id))
+            if staged.overwrite and payload_hash and stored_hash == payload_hash:
+                unchanged.add(staged.row_num)
             else:
-                raise AbortScript(f"Invalid Script Type: {row.get('nice_script_type')}")
-        return circuits
+                pending.append(staged)
+
+        # Cable conflicts of the rows to write, found before any write
+        conflicts = find_cable_conflicts(pending)
+        blocking = [
+            f"Row {staged.row_num}: CID '{staged.cid}': {error}"
+            for staged in pending
+            if not staged.allow_skip
+            for error in conflicts.get(staged.row_num, [])
+        ]
+        if blocking and not isolate_rows:
+            raise AbortScript("Cable conflicts:\n" + "\n".join(blocking))
+
+        identity_map = NiceBulkCircuits.load_identity_map(pending)
+
+        if progress:
+            progress.start("Creating", len(pending) + len(unchanged))
+
+        results = {}
+        for staged in staged_circuits:
+            if staged.row_num <= resume_after:
+                continue
+
+            if staged.row_num in unchanged:
+                logger.log_info(f"CID '{staged.cid}': Unchanged since the last import, skipped.")
+                results[staged.row_num] = {"cid": staged.cid, "result": "unchanged", "description": staged.description}
+                if checkpoint:
+                    checkpoint.update(staged.row_num)
+                if progress:
+                    progress.update()
+                continue
+
+            if staged.row_num in conflicts:
+                for error in conflicts[staged.row_num]:
+                    logger.log_failure(f"Row {staged.row_num}: CID '{staged.cid}': {error}, skipped.")
+                results[staged.row_num] = {"cid": staged.cid, "result": None, "description": staged.description}
+                if checkpoint:
+                    checkpoint.update(staged.row_num)
+                if progress:
+                    progress.update(failed=True)
+                continue
+
+            payload_hash = payload_hashes[staged.row_num]
+
+            # Hydrate one row at a time, only the compact StagedCircuit records are held for the whole run
+            circuit = None
+            try:
+                with transaction.atomic() if isolate_rows else nullcontext():
+                    circuit = staged.hydrate(logger=logger, identity_map=identity_map)
+                    result = circuit.create()
+
+                    # Only stored once the whole row succeeded, so partial failures are retried next time
+                    if result and payload_hash:
+                        utils.save_import_hash(circuit.circuit, payload_hash)
+            except (AbortScript, ValidationError, IntegrityError) as e:
+                if not isolate_rows:
+                    raise
+                logger.log_failure(f"Row {staged.row_num}: CID '{staged.cid}': {e}")
+                result = None
+                # The rolled back row may have changed shared instances
+                identity_map.clear()
+
+            results[staged.row_num] = {"cid": staged.cid, "result": result, "description": staged.description}
+            if checkpoint:
+                checkpoint.update(staged.row_num, circuit.circuit if result else None)
+            if progress:
+                progress.update(failed=not result)
+
+        if checkpoint:
+            checkpoint.clear()
+        if progress:
+            progress.finish()
+
+        return results
+
+    @staticmethod
+    def load_identity_map(staged_circuits: list[StagedCircuit]) -> utils.IdentityMap:
+        """
+        Identity map of the netbox objects referenced by the staged rows, loaded with one query per model
+        """
+        identity_map = utils.IdentityMap()
+        pks = {}
+        for name, model in STAGED_FOREIGN_KEYS.items():
+            pks.setdefault(model, set()).update(getattr(staged, f"{name}_id") for staged in staged_circuits)
+        for model, model_pks in pks.items():
+            identity_map.load(model, model_pks)
+        return identity_map
+
+    @staticmethod
+    def partition_rows_by_site(rows: list[tuple[int, dict]], chunks: int) -> list[list[tuple[int, dict]]]:
+        """
+        Split numbered CSV rows into (up to) `chunks` partitions that never share a site, so no two
+        partitions touch the same patch panels. P2P rows tie both of their sites into one partition.
+        """
+        parent = {}
+
+        def find(site: str) -> str:
+            parent.setdefault(site, site)
+            while parent[site] != site:
+                parent[site] = parent[parent[site]]
+                site = parent[site]
+            return site
+
+        for _, row in rows:
+            site_a = find(row.get("side_a_site") or "")
+            if row.get("nice_script_type") == "P2P Circuit" and row.get("side_z_site"):
+                parent[find(row["side_z_site"])] = site_a
+
+        groups = {}
+        for row_num, row in rows:
+            groups.setdefault(find(row.get("side_a_site") or ""), []).append((row_num, row))
+
+        # Largest site groups first, each into the smallest partition so far
+        partitions = [[] for _ in range(max(1, min(chunks, len(groups))))]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(partitions, key=len).extend(group)
+
+        return [sorted(partition, key=lambda row: row[0]) for partition in partitions if partition]
+
+    @classmethod
+    def from_csv(cls, logger: Script, overwrite: bool = False, filename="", circuit_num: int = 0):
+        """
+        Load up circuits from a CSV, fully hydrated as NiceCircuit objects
+
+        circuit_num: Pull only one circuit out of the CSV (used extensively for tests)
+        """
+        staged = cls.stage_csv(logger=logger, overwrite=overwrite, filename=filename, circuit_num=circuit_num)
+        identity_map = cls.load_identity_map(staged)
+        return [row.hydrate(logger, identity_map) for row in staged]
 
 
 @dataclass(kw_only=True)
@@ -576,13 +1073,6 @@ class NiceStandardCircuit(NiceCircuit):
     The Standard NICE Circuit (device <-> patch panel (optional) <-> site <-> provider_network)
     """
 
-    @classmethod
-    def _from_csv(cls, **kwargs):
-        # return cls(**{k: v for k, v in kwargs.items() if k in inspect.signature(cls).parameters})
-        field_names = {f.name for f in fields(cls)}
-        parameters = inspect.signature(cls).parameters
-        return cls(**{k: v for k, v in kwargs.items() if k in field_names and k in parameters})
-
     def __post_init__(self, **kwargs):
         super().__post_init__()
 
@@ -625,6 +1115,7 @@ class NiceStandardCircuit(NiceCircuit):
             self.interface,
             self.termination_a,
             self.direct_to_device,
+            pp_port_position=self.pp_port_position,
         )
 
         return success
@@ -648,46 +1139,21 @@ class NiceP2PCircuit(NiceCircuit):
     z_interface: Interface
     z_direct_to_device: bool
     z_create_pp_port: bool
-
-    @classmethod
-    def _from_csv(cls, **kwargs):
-        return cls(**{k: v for k, v in kwargs.items() if k in inspect.signature(cls).parameters})
+    z_pp_port_position: int = 1
+    z_pp_port_positions: int = 1
 
     def __post_init__(self):
         super().__post_init__()
-        if self.from_csv:
-            self._prepare_circuit_from_csv()
         self._validate_p2p_data()
 
     def _validate_p2p_data(self):
+        self.z_pp_port_position = self.z_pp_port_position or 1
+        self.z_pp_port_positions = self.z_pp_port_positions or 1
         # Validate sites are unique
         if self.side_a_site == self.side_z_site:
             error = f"Cannot terminate {self.side_a_site} to {self.side_z_site}"
             raise AbortScript(error)
 
-    def _prepare_circuit_from_csv(self) -> None:
-        """
-        Used to prepare the required data as netbox objects, if it was initially loaded from a CSV
-        """
-
-        # Fix bools
-        for field in [
-            "z_direct_to_device",
-            "z_create_pp_port",
-        ]:
-            value = getattr(self, field)
-            setattr(self, field, utils.fix_bools(value))
-
-        # P2P
-        self.side_z_site = utils.get_site_by_name(self.side_z_site)  # P2P
-        self.z_device = utils.get_device_by_name(name=self.z_device, site=self.side_z_site)
-        self.z_interface = utils.get_interface_by_name(name=self.z_interface, device=self.z_device)
-        self.z_pp = utils.get_device_by_name(name=self.z_pp, site=self.side_z_site)
-        self.z_pp_port = utils.get_rearport_by_name(name=self.z_pp_port, device=self.z_pp)
-        self.z_pp_new_port = utils.validate_pp_new_port(
-            port_num=self.z_pp_new_port, logger=self.logger, skip=self.allow_skip
-        )
-
     def _init_patch_panel_properties(self) -> None:
         """
         Initialize any Patch Panel Properties
@@ -704,9 +1170,13 @@ class NiceP2PCircuit(NiceCircuit):
         if error:
             utils.handle_errors(self.logger.log_failure, error, self.allow_skip)
 
-        # Create Patch Panel Port?
+        # Create Patch Panel Port? (no port number: the panel's next free port)
+        if self.z_create_pp_port and not self.z_pp_new_port and not self.z_pp_port and self.z_pp:
+            self.z_pp_new_port = self.next_pp_port(self.z_pp)
         if self.z_pp_new_port and self.z_create_pp_port:
-            self.z_pp_port = self.create_new_pp_port(self.z_pp, self.z_pp_new_port, self.z_pp_port_description)
+            self.z_pp_port = self.create_new_pp_port(
+                self.z_pp, self.z_pp_new_port, self.z_pp_port_description, positions=self.z_pp_port_positions
+            )
 
         valid = super()._validate_x_cables(
             self.z_pp,
@@ -753,6 +1223,7 @@ class NiceP2PCircuit(NiceCircuit):
             self.interface,
             self.termination_a,
             self.direct_to_device,
+            pp_port_position=self.pp_port_position,
         )
         if not success:
             return
@@ -764,6 +1235,7 @@ class NiceP2PCircuit(NiceCircuit):
             self.z_interface,
             self.termination_z,
             self.z_direct_to_device,
+            pp_port_position=self.z_pp_port_position,
         )
 
         return success
@@ -782,37 +1254,13 @@ class NiceMeetMeCircuit(NiceCircuit):
     mm_pp_new_port: bool
     mm_create_pp_port: bool
 
-    @classmethod
-    def _from_csv(cls, **kwargs):
-        return cls(**{k: v for k, v in kwargs.items() if k in inspect.signature(cls).parameters})
-
     def __post_init__(self):
         super().__post_init__()
-        if self.from_csv:
-            self._prepare_circuit_from_csv()
         self._validate_meet_me_data()
 
     def _validate_meet_me_data(self):
         return True
 
-    def _prepare_circuit_from_csv(self) -> None:
-        """
-        Used to prepare the required data as netbox objects, if it was initially loaded from a CSV
-        """
-        # Fix bools
-        for field in [
-            "mm_create_pp_port",
-        ]:
-            value = getattr(self, field)
-            setattr(self, field, utils.fix_bools(value))
-
-        # Meet Me
-        self.mm_pp = utils.get_device_by_name(name=self.mm_pp, site=self.side_a_site)
-        self.mm_pp_port = utils.get_rearport_by_name(name=self.mm_pp_port, device=self.mm_pp)
-        self.mm_pp_new_port = utils.validate_pp_new_port(
-            port_num=self.mm_pp_new_port, logger=self.logger, skip=self.allow_skip
-        )
-
     def create(self):
         self.logger.log_info(f"Beginning Meet Me: {self.cid} / {self.description} creation..")
         result = self.create_meet_me()
@@ -847,11 +1295,17 @@ class NiceMeetMeCircuit(NiceCircuit):
         mm_to_pp_cable = super()._build_device_or_pp_cable(self.pp, self.pp_port, a_side=mm_frontport)
 
         # Device Cable
-        pp_frontport = self.get_frontport(self.pp_port)
+        pp_frontport = self.get_frontport(self.pp_port, self.pp_port_position)
         device_cable = self._build_device_or_pp_cable(self.device, self.interface, a_side=pp_frontport)
 
-        success = utils.save_cables(
-            logger=self.logger, allow_skip=self.allow_skip, cables=[device_cable, mm_to_pp_cable, pp_cable]
-        )
+        success = self.save_cables([device_cable, mm_to_pp_cable, pp_cable])
 
         return success
+
+
+# CSV "NICE Script Type" -> NiceCircuit class
+BULK_SCRIPT_TYPES = {
+    "Standard Circuit": NiceStandardCircuit,
+    "P2P Circuit": NiceP2PCircuit,
+    "MeetMe Circuit": NiceMeetMeCircuit,
+}
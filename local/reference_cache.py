@@ -0,0 +1,88 @@
+from circuits.models import CircuitType, Provider, ProviderNetwork
+from dcim.models import Device, Site
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+REFERENCE_CACHE_KEY = "nice_circuits:references"
+REFERENCE_TIMEOUT = 60 * 60 * 24  # Seconds, dropped sooner by invalidate_references() or a new _fingerprint()
+
+# Cached reference models, with the field scoping their names (None: unique names)
+REFERENCE_MODELS = {
+    Provider: None,
+    CircuitType: None,
+    Site: None,
+    ProviderNetwork: "provider_id",
+    Device: "site_id",
+}
+
+
+def _key(model) -> str:
+    return f"{REFERENCE_CACHE_KEY}:{model._meta.label_lower}"
+
+
+def _fingerprint(model) -> str:
+    """
+    Changes of a reference model (one aggregate query), catching the changes the invalidation signals miss:
+    queryset updates, or processes where local.reference_cache is never imported
+    """
+    aggregate = model.objects.aggregate(count=Count("pk"), last=Max("last_updated"))
+    return f"{aggregate['count']}.{aggregate['last'].timestamp() if aggregate['last'] else 0}"
+
+
+class ReferenceCache:
+    """
+    Name -> pk maps of the reference models (providers, circuit types, sites, provider networks & devices),
+    shared across runs through the Django cache, and dropped whenever one of their objects is saved or deleted.
+    Each instance keeps the maps it used for the rest of the run (one cache read & fingerprint query per model).
+    """
+
+    def __init__(self):
+        self.maps = {}
+
+    def names(self, model) -> dict[str, list[tuple[int, int | None]]]:
+        """
+        Returns:
+            {name: [(pk, scope id)]} in pk order, built from the DB only if not cached yet
+        """
+        if model not in self.maps:
+            fingerprint = _fingerprint(model)
+            cached_fingerprint, names = cache.get(_key(model), (None, None))
+            if names is None or cached_fingerprint != fingerprint:
+                scope = REFERENCE_MODELS[model]
+                names = {}
+                for pk, name, scope_id in model.objects.order_by("pk").values_list("pk", "name", scope or "pk"):
+                    names.setdefault(name, []).append((pk, scope_id if scope else None))
+                cache.set(_key(model), (fingerprint, names), REFERENCE_TIMEOUT)
+            self.maps[model] = names
+        return self.maps[model]
+
+    def covers(self, model, filters: dict) -> bool:
+        """Whether a lookup by name (and filters) can be answered from the maps"""
+        return model in REFERENCE_MODELS and set(filters) <= {REFERENCE_MODELS[model]}
+
+    def get_pk(self, model, name: str, **filters) -> int | None:
+        """As utils.get_pk_by_name, for the lookups covered by the maps"""
+        scope_id = filters.get(REFERENCE_MODELS[model]) if filters else None
+        for pk, pk_scope_id in self.names(model).get(name, []):
+            if scope_id is None or pk_scope_id == scope_id:
+                return pk
+        return None
+
+
+@receiver(post_save, sender=Provider, dispatch_uid="nice_references_provider_saved")
+@receiver(post_delete, sender=Provider, dispatch_uid="nice_references_provider_deleted")
+@receiver(post_save, sender=CircuitType, dispatch_uid="nice_references_circuit_type_saved")
+@receiver(post_delete, sender=CircuitType, dispatch_uid="nice_references_circuit_type_deleted")
+@receiver(post_save, sender=Site, dispatch_uid="nice_references_site_saved")
+@receiver(post_delete, sender=Site, dispatch_uid="nice_references_site_deleted")
+@receiver(post_save, sender=ProviderNetwork, dispatch_uid="nice_references_provider_network_saved")
+@receiver(post_delete, sender=ProviderNetwork, dispatch_uid="nice_references_provider_network_deleted")
+@receiver(post_save, sender=Device, dispatch_uid="nice_references_device_saved")
+@receiver(post_delete, sender=Device, dispatch_uid="nice_references_device_deleted")
+def invalidate_references(sender, **kwargs) -> None:
+    """A reference object changed: its model's map is rebuilt on next use, once the change is committed"""
+    key = _key(sender)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,131 @@
+#
+# Test topology shared by the circuit tests, built once per TestCase class (see CircuitAdderTestCase.setUpTestData)
+#
+from django.contrib.contenttypes.models import ContentType
+
+from dcim.choices import InterfaceTypeChoices, PortTypeChoices
+from dcim.models import (
+    Device,
+    DeviceRole,
+    DeviceType,
+    FrontPortTemplate,
+    Interface,
+    Manufacturer,
+    RearPortTemplate,
+    Site,
+)
+from extras.choices import CustomFieldTypeChoices
+from extras.models import CustomField
+from circuits.models import Circuit, CircuitType, Provider, ProviderNetwork
+
+# Circuit custom fields: name -> type
+CIRCUIT_CUSTOM_FIELDS = {
+    "review": CustomFieldTypeChoices.TYPE_BOOLEAN,
+    "bun": CustomFieldTypeChoices.TYPE_TEXT,
+    "bun_link": CustomFieldTypeChoices.TYPE_TEXT,
+    "import_hash": CustomFieldTypeChoices.TYPE_TEXT,
+}
+
+
+def build_topology(sites: int = 3, interfaces: int = 3, pp_ports: int = 4) -> dict:
+    """
+    Build the test topology, in bulk (one query per model):
+        - Providers, Provider Networks, Circuit Types & Circuits 1 - 3
+        - Per site (Site N): a device (Device N, Interface 1..interfaces) & a patch panel (Patch Panel 1N)
+        - Patch Panel device type with pp_ports port templates (Rear/Front 1..pp_ports)
+        - The Circuit custom fields
+
+    The defaults are the topology referenced by local/tests/*.csv, raise them for larger generated topologies.
+
+    Returns:
+        The created objects, by model name
+    """
+    providers = (
+        Provider(name="Provider 1", slug="provider-1"),
+        Provider(name="Provider 2", slug="provider-2"),
+        Provider(name="Provider 3", slug="provider-3"),
+    )
+    Provider.objects.bulk_create(providers)
+
+    provider_networks = (
+        ProviderNetwork(name="Provider-Network 1", provider=providers[0]),
+        ProviderNetwork(name="Provider-Network 2", provider=providers[1]),
+        ProviderNetwork(name="Provider-Network 2", provider=providers[2]),
+    )
+    ProviderNetwork.objects.bulk_create(provider_networks)
+
+    circuit_types = (
+        CircuitType(name="Circuit-Type 1", slug="circuit-type-1"),
+        CircuitType(name="Circuit-Type 2", slug="circuit-type-2"),
+        CircuitType(name="Circuit-Type 3", slug="circuit-type-3"),
+    )
+    CircuitType.objects.bulk_create(circuit_types)
+
+    circuits = (
+        Circuit(cid="Circuit 1", provider=providers[0], type=circuit_types[0]),
+        Circuit(cid="Circuit 2", provider=providers[1], type=circuit_types[1]),
+        Circuit(cid="Circuit 3", provider=providers[2], type=circuit_types[2]),
+    )
+    Circuit.objects.bulk_create(circuits)
+
+    site_list = [Site(name=f"Site {i}", slug=f"site-{i}") for i in range(1, sites + 1)]
+    Site.objects.bulk_create(site_list)
+
+    manufacturer = Manufacturer.objects.create(name="Manufacturer 1", slug="manufacturer-1")
+    device_types = [
+        DeviceType(manufacturer=manufacturer, model=f"Device-Type {i}", slug=f"device-type-{i}")
+        for i in range(1, sites + 1)
+    ]
+    pp_type = DeviceType(manufacturer=manufacturer, model="Patch-Panel-Type 1", slug="patch-panel-1")
+    DeviceType.objects.bulk_create(device_types + [pp_type])
+    role = DeviceRole.objects.create(name="Device-Role 1", slug="device-role-1")
+
+    rearport_templates = [
+        RearPortTemplate(device_type=pp_type, name=f"Rear {i}", type=PortTypeChoices.TYPE_LC, positions=1)
+        for i in range(1, pp_ports + 1)
+    ]
+    RearPortTemplate.objects.bulk_create(rearport_templates)
+    FrontPortTemplate.objects.bulk_create(
+        [
+            FrontPortTemplate(device_type=pp_type, name=f"Front {i}", type=PortTypeChoices.TYPE_LC, rear_port=rear_port)
+            for i, rear_port in enumerate(rearport_templates, start=1)
+        ]
+    )
+
+    devices = [
+        Device(name=f"Device {i}", site=site, device_type=device_type, role=role)
+        for i, (site, device_type) in enumerate(zip(site_list, device_types), start=1)
+    ]
+    patch_panels = [
+        Device(name=f"Patch Panel {10 + i}", site=site, device_type=pp_type, role=role)
+        for i, site in enumerate(site_list, start=1)
+    ]
+    Device.objects.bulk_create(devices + patch_panels)
+
+    interface_list = [
+        Interface(name=f"Interface {i}", device=device, type=InterfaceTypeChoices.TYPE_1GE_FIXED)
+        for i in range(1, interfaces + 1)
+        for device in devices
+    ]
+    Interface.objects.bulk_create(interface_list)
+
+    circuit_type = ContentType.objects.get_for_model(Circuit)
+    custom_fields = []
+    for name, field_type in CIRCUIT_CUSTOM_FIELDS.items():
+        custom_field = CustomField(name=name, type=field_type)
+        custom_field.full_clean()
+        custom_field.save()
+        custom_field.content_types.set([circuit_type])
+        custom_fields.append(custom_field)
+
+    return {
+        "providers": providers,
+        "provider_networks": provider_networks,
+        "circuit_types": circuit_types,
+        "circuits": circuits,
+        "sites": site_list,
+        "devices": devices,
+        "patch_panels": patch_panels,
+        "interfaces": interface_list,
+        "custom_fields": custom_fields,
+    }
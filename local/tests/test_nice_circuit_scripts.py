@@ -1,31 +1,43 @@
 #
 # export NETBOX_CONFIGURATION=netbox.configuration_testing
-# python manage.py test scripts.testing_circuits -v 3 --keepdb
+# python manage.py test scripts.testing_circuits -v 3 --keepdb --parallel
 
-from django.contrib.contenttypes.models import ContentType
+from unittest import mock
 
-from dcim.choices import InterfaceTypeChoices, PortTypeChoices
+from dcim.choices import PortTypeChoices
 from dcim.models import (
     Device,
     DeviceType,
     DeviceRole,
-    FrontPortTemplate,
     Interface,
-    Manufacturer,
-    RearPortTemplate,
+    Region,
     Site,
 )
-from extras.choices import CustomFieldTypeChoices
-from extras.models import CustomField
 from circuits.models import Circuit, CircuitType, CircuitTermination, Provider, ProviderNetwork
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.utils import timezone
 from utilities.testing.base import TestCase
 
 # from extras.choices import LogLevelChoices
 from extras.scripts import Script
-from scripts.nice_circuit_scripts import BulkCircuits, StandardCircuit
+from scripts.nice_circuit_scripts import BulkCircuits, CircuitValidation, StandardCircuit
+import dataclasses
+import gzip
+import io
 import os
+import uuid
 from local.utils import *
-from local.nice_circuits import NiceBulkCircuits, NiceCircuit, NiceStandardCircuit
+from local.nice_circuits import NiceBulkCircuits, NiceCircuit, NiceStandardCircuit, StagedCircuit
+from local.bulk_jobs import LOCAL_QUEUES, InProcessQueue, fan_out, import_chunk
+from local.bulk_planner import BulkPlanner, find_cable_conflicts
+from local import circuit_diagrams, reference_cache, topology
+from local.reference_cache import ReferenceCache
+from local.topology import TopologyGraph
+from local.validators import STANDARD, VALIDATION_RULES, CircuitValidator, ValidationRule, register_rule
+from local.circuit_diagrams import iter_circuit_diagrams
+from local.circuit_export import iter_circuits_csv
+from local.tests.fixtures import build_topology
 
 
 class CircuitAdderTestCase(TestCase):
@@ -37,169 +49,25 @@ class CircuitAdderTestCase(TestCase):
 
     form_data = {}
 
-    # Set up Test Database
+    # Set up Test Database, once for the whole class (each test runs in its own transaction)
     @classmethod
     def setUpTestData(cls):
-        # script_dir = os.path.dirname(__file__)
-        # csv_test_filename = "csv_bulk_circuits_test.csv"
-        # filename = os.path.join(script_dir, csv_test_filename)
-        # iofile = open(filename, mode="rb")
-        # cls.csv_data = load_data_from_csv(iofile)
-        # iofile.close()
-        ...
+        cls.fixtures = build_topology()
 
     def setUp(self):
         super().setUp()
-
-        providers = (
-            Provider(name="Provider 1", slug="provider-1"),
-            Provider(name="Provider 2", slug="provider-2"),
-            Provider(name="Provider 3", slug="provider-3"),
-        )
-        Provider.objects.bulk_create(providers)
-
-        provider_networks = (
-            ProviderNetwork(name="Provider-Network 1", provider=providers[0]),  # , slug="provider-1"),
-            ProviderNetwork(name="Provider-Network 2", provider=providers[1]),  # , slug="provider-2"),
-            ProviderNetwork(name="Provider-Network 2", provider=providers[2]),  # , slug="provider-2"),
-        )
-        ProviderNetwork.objects.bulk_create(provider_networks)
-
-        circuittypes = (
-            CircuitType(name="Circuit-Type 1", slug="circuit-type-1"),
-            CircuitType(name="Circuit-Type 2", slug="circuit-type-2"),
-            CircuitType(name="Circuit-Type 3", slug="circuit-type-3"),
-        )
-        CircuitType.objects.bulk_create(circuittypes)
-
-        circuits = (
-            Circuit(cid="Circuit 1", provider=providers[0], type=circuittypes[0]),
-            Circuit(cid="Circuit 2", provider=providers[1], type=circuittypes[1]),
-            Circuit(cid="Circuit 3", provider=providers[2], type=circuittypes[2]),
-        )
-        Circuit.objects.bulk_create(circuits)
-
-        sites = (
-            Site(name="Site 1", slug="site-1"),
-            Site(name="Site 2", slug="site-2"),
-            Site(name="Site 3", slug="site-3"),
-        )
-        Site.objects.bulk_create(sites)
-
-        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
-        device_types = (
-            DeviceType(manufacturer=manufacturer, model='Device-Type 1', slug='device-type-1'),
-            DeviceType(manufacturer=manufacturer, model='Device-Type 2', slug='device-type-2'),
-            DeviceType(manufacturer=manufacturer, model='Device-Type 3', slug='device-type-3'),
-            DeviceType(manufacturer=manufacturer, model='Patch-Panel-Type 1', slug='patch-panel-1'),
-        )
-        DeviceType.objects.bulk_create(device_types)
-        DeviceRole.objects.create(name='Device-Role 1', slug='device-role-1')
-
-        rearport_templates = (
-            RearPortTemplate(device_type=device_types[3], name="Rear 1", type=PortTypeChoices.TYPE_LC, positions=1),
-            RearPortTemplate(device_type=device_types[3], name="Rear 2", type=PortTypeChoices.TYPE_LC, positions=1),
-            RearPortTemplate(device_type=device_types[3], name="Rear 3", type=PortTypeChoices.TYPE_LC, positions=1),
-            RearPortTemplate(device_type=device_types[3], name="Rear 4", type=PortTypeChoices.TYPE_LC, positions=1),
-        )
-        RearPortTemplate.objects.bulk_create(rearport_templates)
-
-        frontport_templates = (
-            FrontPortTemplate(
-                device_type=device_types[3],
-                name="Front 1",
-                type=PortTypeChoices.TYPE_LC,
-                rear_port=rearport_templates[0],
-            ),
-            FrontPortTemplate(
-                device_type=device_types[3],
-                name="Front 2",
-                type=PortTypeChoices.TYPE_LC,
-                rear_port=rearport_templates[1],
-            ),
-            FrontPortTemplate(
-                device_type=device_types[3],
-                name="Front 3",
-                type=PortTypeChoices.TYPE_LC,
-                rear_port=rearport_templates[2],
-            ),
-            FrontPortTemplate(
-                device_type=device_types[3],
-                name="Front 4",
-                type=PortTypeChoices.TYPE_LC,
-                rear_port=rearport_templates[3],
-            ),
-        )
-        FrontPortTemplate.objects.bulk_create(frontport_templates)
-
-        devices = (
-            Device(
-                name="Device 1",
-                site=sites[0],
-                device_type=device_types[0],
-                role=DeviceRole.objects.first(),
-            ),
-            Device(
-                name="Device 2",
-                site=sites[1],
-                device_type=device_types[1],
-                role=DeviceRole.objects.first(),
-            ),
-            Device(
-                name="Device 3",
-                site=sites[2],
-                device_type=device_types[2],
-                role=DeviceRole.objects.first(),
-            ),
-            Device(
-                name="Patch Panel 11",
-                site=sites[0],
-                device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
-                role=DeviceRole.objects.first(),
-            ),
-            Device(
-                name="Patch Panel 12",
-                site=sites[1],
-                device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
-                role=DeviceRole.objects.first(),
-            ),
-            Device(
-                name="Patch Panel 13",
-                site=sites[2],
-                device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
-                role=DeviceRole.objects.first(),
-            ),
-        )
-        Device.objects.bulk_create(devices)
-
-        interfaces = (
-            Interface(name="Interface 1", device=devices[0], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 1", device=devices[1], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 1", device=devices[2], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 2", device=devices[0], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 2", device=devices[1], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 2", device=devices[2], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 3", device=devices[0], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 3", device=devices[1], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-            Interface(name="Interface 3", device=devices[2], type=InterfaceTypeChoices.TYPE_1GE_FIXED),
-        )
-        Interface.objects.bulk_create(interfaces)
-
-        # Custom Fields
-        cf_review = CustomField(name="review", type=CustomFieldTypeChoices.TYPE_BOOLEAN)
-        cf_review.full_clean()
-        cf_review.save()
-        cf_review.content_types.set([ContentType.objects.get_for_model(Circuit)])
-
-        cf_bun = CustomField(name="bun", type=CustomFieldTypeChoices.TYPE_TEXT)
-        cf_bun.full_clean()
-        cf_bun.save()
-        cf_bun.content_types.set([ContentType.objects.get_for_model(Circuit)])
-
-        cf_bun_link = CustomField(name="bun_link", type=CustomFieldTypeChoices.TYPE_TEXT)
-        cf_bun_link.full_clean()
-        cf_bun_link.save()
-        cf_bun_link.content_types.set([ContentType.objects.get_for_model(Circuit)])
+        # Cache keys private to this test, the cache is shared between parallel test processes
+        self.cache_prefix = f"test:{uuid.uuid4().hex}"
+        for name in ("GRAPH_CACHE_KEY", "GRAPH_VERSION_KEY"):
+            patcher = mock.patch.object(topology, name, f"{self.cache_prefix}:{name.lower()}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(circuit_diagrams, "DIAGRAM_CACHE_KEY", f"{self.cache_prefix}:diagram")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(reference_cache, "REFERENCE_CACHE_KEY", f"{self.cache_prefix}:references")
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     # Tests
     def test_get_provider_by_name(self):
@@ -250,6 +118,213 @@ class CircuitAdderTestCase(TestCase):
         interface = get_interface_by_name(name="Interface Missing", device=Device.objects.first())
         self.assertIsNone(interface)
 
+    def test_interface_lookup(self):
+        Device(
+            site=Site.objects.first(),
+            device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
+            role=DeviceRole.objects.first(),
+            name="Patch Panel 1",
+        ).save()
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=3
+        )
+        circuits[0].create()
+        interface = circuits[0].interface
+
+        paths = TopologyGraph.load().lookup_interface(interface.pk)
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(paths[0].circuit_id, circuits[0].circuit.pk)
+        self.assertEqual(paths[0].term_side, "A")
+        self.assertEqual(len(paths[0].ports), 2)  # Through the Patch Panel (RearPort & FrontPort)
+        self.assertEqual(len(paths[0].cable_ids), 2)
+
+    def test_topology_graph(self):
+        Device(
+            site=Site.objects.first(),
+            device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
+            role=DeviceRole.objects.first(),
+            name="Patch Panel 1",
+        ).save()
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=3
+        )
+        circuits[0].create()
+        circuit = circuits[0].circuit
+
+        graph = TopologyGraph.load()
+        node = graph.circuits[circuit.pk]
+        self.assertEqual(node.terminations["A"].site_id, circuits[0].site.pk)
+        self.assertEqual(len(node.terminations["A"].path.hops), 2)
+        self.assertEqual(graph.lookup_interface(circuits[0].interface.pk)[0].circuit_id, circuit.pk)
+
+        valid, message = CircuitValidator().validate(circuit, graph=graph)
+        self.assertTrue(valid, message)
+        self.assertEqual(valid, CircuitValidator().validate(circuit)[0])  # Same result without a prebuilt graph
+
+        # Cached until the cabling changes
+        with mock.patch.object(TopologyGraph, "build") as build:
+            TopologyGraph.load()
+        build.assert_not_called()
+
+        # Bounded cache key, whatever the number of sites
+        with mock.patch("local.topology.cache.set") as cache_set:
+            TopologyGraph.load(set(range(1, 1000)))
+        self.assertLessEqual(len(cache_set.call_args[0][0]), 250)
+
+        # Circuit & name changes too
+        circuit.type = CircuitType.objects.exclude(pk=circuit.type_id).first()
+        circuit.save()
+        site = Site.objects.get(pk=circuits[0].site.pk)
+        site.name = "Site 1 (renamed)"
+        site.save()
+        node = TopologyGraph.load().circuits[circuit.pk]
+        self.assertEqual((node.type, node.terminations["A"].site), (circuit.type.name, site.name))
+
+        CircuitTermination.objects.get(circuit=circuit, term_side="A").cable.delete()
+        valid, message = CircuitValidator().validate(circuit, graph=TopologyGraph.load())
+        self.assertFalse(valid)
+        self.assertEqual(message, "Invalid -- Standard -- No Cable found for Termination A.")
+
+    def test_validation_rules(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        circuits[0].create()
+        circuit = circuits[0].circuit
+        site = circuits[0].site
+        self.assertTrue(CircuitValidator().validate(circuit)[0])
+
+        # Site specific rules only run for the circuits of their sites
+        self.addCleanup(VALIDATION_RULES.__setitem__, slice(None), list(VALIDATION_RULES))
+        other_site = Site.objects.exclude(pk=site.pk).first()
+        rule = ValidationRule("site_rule", lambda validator: (False, "Site rule"), frozenset({STANDARD}), cost=5)
+        register_rule(rule._replace(site_ids=frozenset({site.pk})))
+        self.assertEqual(CircuitValidator().validate(circuit), (False, "Invalid -- Standard -- Site rule"))
+        register_rule(rule._replace(site_ids=frozenset({other_site.pk})))
+        self.assertTrue(CircuitValidator().validate(circuit)[0])
+
+        # Cheapest first: no cable walk once a cheaper rule failed
+        CircuitTermination.objects.get(circuit=circuit, term_side="A").cable.delete()
+        with mock.patch.object(CircuitValidator, "cable_check") as cable_check:
+            valid, message = CircuitValidator().validate(circuit)
+        cable_check.assert_not_called()
+        self.assertEqual(message, "Invalid -- Standard -- No Cable found for Termination A.")
+
+    def test_circuit_validation_sites(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        circuits[0].create()
+        site = circuits[0].site
+
+        data = {"circuit": None, "sites": [site], "regions": None}
+        self.assertEqual(CircuitValidation().run(data, commit=False).splitlines()[0], "Valid: 1, Invalid: 0")
+
+        # Sites of child regions included
+        parent = Region.objects.create(name="Region 1", slug="region-1")
+        region = Region.objects.create(name="Region 2", slug="region-2", parent=parent)
+        site.region = region
+        site.save()
+        data = {"circuit": None, "sites": None, "regions": [parent]}
+        self.assertEqual(CircuitValidation().run(data, commit=False).splitlines()[0], "Valid: 1, Invalid: 0")
+
+        other_site = Site.objects.exclude(pk=site.pk).first()
+        data = {"circuit": None, "sites": [other_site], "regions": None}
+        self.assertEqual(CircuitValidation().run(data, commit=False).splitlines()[0], "Valid: 0, Invalid: 0")
+
+        # Region without Sites: nothing to load the graph for
+        empty = Region.objects.create(name="Region 3", slug="region-3")
+        data = {"circuit": None, "sites": None, "regions": [empty]}
+        self.assertEqual(CircuitValidation().run(data, commit=False).splitlines()[0], "Valid: 0, Invalid: 0")
+
+    def test_circuit_diagrams(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        circuits[0].create()
+
+        queryset = Circuit.objects.filter(pk=circuits[0].circuit.pk)
+        diagrams = dict(iter_circuit_diagrams(queryset))
+        diagram = diagrams[circuits[0].cid]
+        self.assertTrue(diagram.startswith("graph LR"))
+        self.assertIn(f"{circuits[0].device.name}/{circuits[0].interface.name}", diagram)
+        self.assertIn(f"{circuits[0].site.name}/{circuits[0].cid}", diagram)
+
+        # Cached until the cabling changes, out of the cached topology graph
+        with (
+            mock.patch("local.circuit_diagrams.render_diagram") as render,
+            mock.patch.object(TopologyGraph, "build") as build,
+        ):
+            self.assertEqual(dict(iter_circuit_diagrams(queryset)), diagrams)
+        render.assert_not_called()
+        build.assert_not_called()
+
+        # Renaming the device changes the labels, so the diagram is rendered again
+        circuits[0].device.name = "Renamed Device"
+        circuits[0].device.save()
+        diagram = dict(iter_circuit_diagrams(queryset))[circuits[0].cid]
+        self.assertIn(f"Renamed Device/{circuits[0].interface.name}", diagram)
+
+    def test_export_circuits_csv(self):
+        Device(
+            site=Site.objects.get(name="Site 1"),
+            device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
+            role=DeviceRole.objects.first(),
+            name="Patch Panel 1",
+        ).save()
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        circuits[0].create()
+        # Through a Patch Panel
+        circuits += NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=3
+        )
+        circuits[1].create()
+        # On a cassette position
+        pp = Device.objects.get(name="Patch Panel 11")
+        cassette = circuits[0].create_new_pp_port(pp, 20, "Cassette", positions=4)
+        staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=1)[0]
+        staged = dataclasses.replace(
+            staged,
+            cid="Circuit 99",
+            interface_id=Interface.objects.get(device__name="Device 1", name="Interface 3").pk,
+            pp_id=pp.pk,
+            pp_port_id=cassette.pk,
+            pp_port_position=3,
+            direct_to_device=False,
+        )
+        NiceBulkCircuits.create_circuits(StandardCircuit(), [staged])
+
+        circuit_ids = [circuit.circuit.pk for circuit in circuits] + [Circuit.objects.get(cid="Circuit 99").pk]
+        exported = "".join(iter_circuits_csv(Circuit.objects.filter(pk__in=circuit_ids), chunk_size=2))
+        rows = load_data_from_csv(io.BytesIO(exported.encode()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["cid"], circuits[0].cid)
+        self.assertEqual(rows[0]["nice_script_type"], "Standard Circuit")
+        self.assertEqual(rows[0]["device"], circuits[0].device.name)
+        self.assertEqual(rows[0]["interface"], circuits[0].interface.name)
+        self.assertEqual(rows[0]["direct_to_device"], "TRUE")
+        self.assertEqual(rows[1]["pp_port"], circuits[1].pp_port.name)
+        self.assertEqual((rows[2]["pp_port"], rows[2]["pp_port_position"]), (cassette.name, "3"))
+
+        # Re-importable as is: the cabled circuits are re-synced
+        staged = NiceBulkCircuits.stage_rows(StandardCircuit(), list(enumerate(rows, start=1)))
+        self.assertEqual(staged[0].interface_id, circuits[0].interface.pk)
+        cables = set(CircuitTermination.objects.filter(circuit_id__in=circuit_ids).values_list("cable_id", flat=True))
+        results = NiceBulkCircuits.create_circuits(StandardCircuit(), staged)
+        self.assertTrue(all(result["result"] for result in results.values()))
+        self.assertEqual(
+            set(CircuitTermination.objects.filter(circuit_id__in=circuit_ids).values_list("cable_id", flat=True)),
+            cables,
+        )
+
     def test_load_data_from_csv(self):
         csv_test_filename = "local/tests/test_bulk_circuits.csv"
         circuits = NiceBulkCircuits.from_csv(
@@ -257,6 +332,291 @@ class CircuitAdderTestCase(TestCase):
         )
         self.assertIsInstance(circuits[0], NiceStandardCircuit)
 
+    def test_stage_csv_compact(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        staged = NiceBulkCircuits.stage_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        # Slotted, with foreign keys held as primary keys only
+        self.assertFalse(hasattr(staged[0], "__dict__"))
+        self.assertEqual(staged[0].provider_id, Provider.objects.get(name="Provider 1").pk)
+        self.assertIsInstance(staged[0].hydrate(StandardCircuit()), NiceStandardCircuit)
+
+    def test_validate_date_formats(self):
+        self.assertEqual(validate_date("2021-02-01"), "2021-02-01")
+        self.assertEqual(validate_date("2/1/21"), "2021-02-01")
+        self.assertEqual(validate_date("9/9/99"), "1999-09-09")
+        # Falls back to dateutil
+        self.assertEqual(validate_date("Feb 1 2021"), "2021-02-01")
+        with self.assertRaisesMessage(AbortScript, "Invalid date"):
+            validate_date("2/30/21")
+        with self.assertRaisesMessage(AbortScript, "outside constraints"):
+            validate_date("1970-01-01")
+
+    def test_get_bun_link(self):
+        self.assertEqual(generate_range("0125"), ("0101", "0150"))
+        self.assertEqual(get_bun_link("0125"), f"{customs['bun_root_path']}\\0101 - 0150\\")
+        reset_bun_cache("Y:\\Other")
+        self.assertEqual(get_bun_link("0125"), "Y:\\Other\\0101 - 0150\\")
+        reset_bun_cache()
+
+    def test_bulk_planner(self):
+        csv_test_filename_fail = "local/tests/test_bulk_circuits_fail.csv"
+        circuit_count = Circuit.objects.count()
+        rows = NiceBulkCircuits.load_rows(filename=csv_test_filename_fail)
+        plans = BulkPlanner(rows).plan()
+
+        self.assertEqual(len(plans), len(rows))
+        self.assertIn("Missing/Not Found Mandatory Value", plans[0].errors[0])
+        # As the import would: skipped, its interface is claimed by row 1
+        self.assertTrue(
+            any("Interface Device 1/Interface 1 is already used by row 1" in error for error in plans[3].errors)
+        )
+        self.assertTrue(any("Patch Panel or port" in error for error in plans[5].errors))
+        self.assertTrue(any("New Patch Panel Port must be below 48" in error for error in plans[10].errors))
+        # Nothing written
+        self.assertEqual(Circuit.objects.count(), circuit_count)
+
+    def test_find_cable_conflicts(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        staged = NiceBulkCircuits.stage_csv(
+            logger=StandardCircuit(), overwrite=True, filename=csv_test_filename, circuit_num=2
+        )
+        # Same interface claimed twice within the file
+        rows = [staged[0], dataclasses.replace(staged[0], row_num=99, allow_skip=False)]
+        self.assertEqual(find_cable_conflicts(rows[:1]), {})
+        conflicts = find_cable_conflicts(rows)
+        self.assertEqual(list(conflicts), [99])
+        self.assertIn("is already used by row 2", conflicts[99][0])
+
+        # Conflicting rows are rejected before anything is written
+        circuit = Circuit.objects.get(cid="Circuit 1")
+        with self.assertRaisesMessage(AbortScript, "Cable conflicts"):
+            NiceBulkCircuits.create_circuits(StandardCircuit(), rows)
+        self.assertEqual(Circuit.objects.get(cid="Circuit 1").last_updated, circuit.last_updated)
+
+    def test_overwrite_cabled_circuit(self):
+        Device(
+            site=Site.objects.get(name="Site 1"),
+            device_type=DeviceType.objects.get(model="Patch-Panel-Type 1"),
+            role=DeviceRole.objects.first(),
+            name="Patch Panel 1",
+        ).save()
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=3)
+        NiceBulkCircuits.create_circuits(StandardCircuit(), staged)
+        cable_ids = set(CircuitTermination.objects.filter(circuit__cid="Circuit 22").values_list("cable_id", flat=True))
+
+        # Re-sync: the circuit's own cables are not conflicts, nor cabled again
+        staged = NiceBulkCircuits.stage_csv(
+            logger=StandardCircuit(), overwrite=True, filename=csv_test_filename, circuit_num=3
+        )
+        self.assertEqual(find_cable_conflicts(staged), {})
+        self.assertTrue(BulkPlanner(NiceBulkCircuits.load_rows(csv_test_filename, 3), overwrite=True).plan()[0].valid)
+        with self.assertLogs("netbox.scripts.scripts.nice_circuit_scripts.StandardCircuit", level="INFO") as logs:
+            results = NiceBulkCircuits.create_circuits(StandardCircuit(), staged)
+        self.assertTrue(results[staged[0].row_num]["result"])
+        self.assertFalse(any("Saved Cable:" in log for log in logs.output))
+        self.assertEqual(
+            set(CircuitTermination.objects.filter(circuit__cid="Circuit 22").values_list("cable_id", flat=True)),
+            cable_ids,
+        )
+
+        # Without overwrite, still a conflict
+        self.assertIn(staged[0].row_num, find_cable_conflicts([dataclasses.replace(staged[0], overwrite=False)]))
+
+    def test_cassette_pp_port(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        pp = Device.objects.get(name="Patch Panel 11")
+        rear_port = circuits[0].create_new_pp_port(pp, 20, "Cassette", positions=4)
+
+        self.assertEqual(rear_port.positions, 4)
+        front_ports = FrontPort.objects.filter(rear_port=rear_port).order_by("rear_port_position")
+        self.assertEqual([port.name for port in front_ports], [f"Front20-{i}" for i in range(1, 5)])
+
+        # Positions resolved once for the whole panel
+        self.assertEqual(circuits[0].get_frontport(rear_port, 3).name, "Front20-3")
+        with self.assertNumQueries(0):
+            self.assertEqual(circuits[0].get_frontport(rear_port, 4).name, "Front20-4")
+
+        # Lower port numbers filled in, as for single position ports
+        self.assertTrue(pp.rearports.filter(name="Rear19").exists())
+
+        # Rows on different positions of the same cassette still share its RearPort (trunk)
+        staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=1)[0]
+        staged = dataclasses.replace(staged, pp_id=pp.pk, pp_port_id=rear_port.pk, direct_to_device=False)
+        rows = [
+            dataclasses.replace(staged, row_num=1, interface_id=None, pp_port_position=1),
+            dataclasses.replace(staged, row_num=2, interface_id=None, pp_port_position=2),
+        ]
+        self.assertIn("(Position 2) is already used by row 1", find_cable_conflicts(rows)[2][0])
+
+        # Traced through the cabled position
+        row = dataclasses.replace(staged, pp_port_position=3)
+        results = NiceBulkCircuits.create_circuits(StandardCircuit(), [row])
+        self.assertTrue(results[row.row_num]["result"])
+        (path,) = topology.trace_paths({Circuit.objects.get(cid=row.cid).pk})
+        self.assertIn((topology.FRONT_PORT, front_ports[2].pk), path.ports)
+        self.assertEqual(path.interface_id, row.interface_id)
+
+    def test_identity_map(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        rows = NiceBulkCircuits.load_rows(csv_test_filename, circuit_num=1)
+        rows += NiceBulkCircuits.load_rows(csv_test_filename, circuit_num=3)
+        staged = NiceBulkCircuits.stage_rows(StandardCircuit(), rows)
+        identity_map = NiceBulkCircuits.load_identity_map(staged)
+
+        # Every row shares the same instances, no query once the map is loaded
+        with self.assertNumQueries(0):
+            circuits = [row.hydrate(StandardCircuit(), identity_map) for row in staged]
+            self.assertIs(circuits[0].side_a_site, circuits[1].side_a_site)
+            self.assertIs(circuits[0].provider, identity_map.get(Provider, staged[0].provider_id))
+            self.assertIs(circuits[0].device.site, circuits[0].side_a_site)
+
+    def test_identity_map_cassette_rows(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=False, filename=csv_test_filename, circuit_num=1
+        )
+        pp = Device.objects.get(name="Patch Panel 11")
+        rear_port = circuits[0].create_new_pp_port(pp, 20, "Cassette", positions=4)
+
+        # Two rows on the same uncabled cassette, past the planner: the second sees the trunk cabled by the first
+        staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=1)[0]
+        staged = dataclasses.replace(
+            staged, pp_id=pp.pk, pp_port_id=rear_port.pk, direct_to_device=False, allow_skip=False
+        )
+        rows = [
+            dataclasses.replace(staged, row_num=1, pp_port_position=1),
+            dataclasses.replace(
+                staged,
+                row_num=2,
+                cid="Circuit 99",
+                interface_id=Interface.objects.get(device__name="Device 1", name="Interface 2").pk,
+                pp_port_position=2,
+            ),
+        ]
+        with (
+            mock.patch("local.nice_circuits.find_cable_conflicts", return_value={}),
+            self.assertLogs("netbox.scripts.scripts.nice_circuit_scripts.StandardCircuit", level="INFO") as logs,
+        ):
+            results = NiceBulkCircuits.create_circuits(StandardCircuit(), rows, isolate_rows=True)
+
+        self.assertTrue(results[1]["result"])
+        self.assertFalse(results[2]["result"])
+        self.assertTrue(any(f"Patch Panel Port {pp}/{rear_port} already has a Cable" in log for log in logs.output))
+        self.assertFalse(Circuit.objects.filter(cid="Circuit 99").exists())
+        rear_port.refresh_from_db()
+        self.assertEqual(rear_port.cable.a_terminations[0].circuit.cid, staged.cid)
+
+    def test_reference_cache(self):
+        site = Site.objects.get(name="Site 1")
+        device = Device.objects.get(name="Device 1")
+        ReferenceCache().names(Site)
+        ReferenceCache().names(Device)
+
+        # Warm for the next runs: only a fingerprint query per model
+        with self.assertNumQueries(2):
+            references = ReferenceCache()
+            self.assertEqual(get_pk_by_name(Site, "Site 1", references=references), site.pk)
+            self.assertEqual(get_pk_by_name(Device, "Device 1", references=references, site_id=site.pk), device.pk)
+            self.assertIsNone(get_pk_by_name(Device, "Device 1", references=references, site_id=site.pk + 1000))
+
+        # Invalidated by saves, once committed
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            new_site = Site.objects.create(name="Site 9", slug="site-9")
+        self.assertTrue(callbacks)
+        self.assertEqual(ReferenceCache().get_pk(Site, "Site 9"), new_site.pk)
+
+        # And by the changes the signals miss
+        Site.objects.filter(pk=new_site.pk).update(name="Site 10", last_updated=timezone.now())
+        self.assertEqual(ReferenceCache().get_pk(Site, "Site 10"), new_site.pk)
+
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        with mock.patch("local.utils.REFERENCE_CACHE", True):
+            staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=1)
+        self.assertEqual(staged[0].side_a_site_id, site.pk)
+        self.assertEqual(staged[0].device_id, device.pk)
+
+    def test_free_port_index(self):
+        pp = Device.objects.get(name="Patch Panel 11")
+        RearPort.objects.create(device=pp, name="Rear3", type=PortTypeChoices.TYPE_LC)
+        index = FreePortIndex()
+        self.assertEqual(index.allocate(pp.pk, pp.site_id), 4)
+        # Requested port numbers are never handed out
+        index.reserve(pp.pk, pp.site_id, 6)
+        self.assertEqual(index.allocate(pp.pk, pp.site_id), 7)
+        index.reserve(pp.pk, pp.site_id, MAX_PP_PORT)
+        self.assertIsNone(index.allocate(pp.pk, pp.site_id))
+
+    def test_bulk_checkpoint(self):
+        circuit = Circuit.objects.first()
+        checkpoint = BulkCheckpoint(f"{self.cache_prefix}:file-hash", interval=2)
+        checkpoint.update(1, circuit)
+        self.assertEqual(BulkCheckpoint(f"{self.cache_prefix}:file-hash").load(), 0)  # Not saved until the interval
+        checkpoint.update(2)
+        self.assertEqual(BulkCheckpoint(f"{self.cache_prefix}:file-hash").load(), 2)
+
+        # Witness circuit was rolled back, start over
+        checkpoint.update(3, Circuit(pk=circuit.pk + 1000, last_updated=circuit.last_updated))
+        checkpoint.save()
+        self.assertEqual(BulkCheckpoint(f"{self.cache_prefix}:file-hash").load(), 0)
+
+        # Same file, other options: not the same import
+        checkpoint = BulkCheckpoint(f"{self.cache_prefix}:file-hash", overwrite=True)
+        checkpoint.update(4)
+        checkpoint.save()
+        self.assertEqual(BulkCheckpoint(f"{self.cache_prefix}:file-hash", overwrite=False).load(), 0)
+        self.assertEqual(BulkCheckpoint(f"{self.cache_prefix}:file-hash", overwrite=True).load(), 4)
+
+    def test_progress_reporter(self):
+        lines = []
+        with mock.patch("local.utils.time.monotonic", side_effect=[0, 10, 20, 40, 50]):
+            progress = ProgressReporter(lines.append, interval=30)
+            progress.start("Creating", 4)
+            progress.update()
+            progress.update(failed=True)
+            self.assertEqual(lines, [])  # Not before the interval
+            progress.update()
+            summary = progress.summary()
+        self.assertEqual(lines, ["Creating: 3/4 rows, 0.1 rows/s, ETA 0:00:13, 1 failures"])
+        self.assertEqual(summary, "Creating: 3 rows in 50.0s (0.1 rows/s), 1 failures")
+
+    def test_partition_rows_by_site(self):
+        rows = [
+            (1, {"nice_script_type": "Standard Circuit", "side_a_site": "Site 1"}),
+            (2, {"nice_script_type": "Standard Circuit", "side_a_site": "Site 2"}),
+            (3, {"nice_script_type": "Standard Circuit", "side_a_site": "Site 3"}),
+            (4, {"nice_script_type": "P2P Circuit", "side_a_site": "Site 3", "side_z_site": "Site 1"}),
+        ]
+        partitions = NiceBulkCircuits.partition_rows_by_site(rows, chunks=2)
+        self.assertEqual([[row_num for row_num, _ in partition] for partition in partitions], [[1, 3, 4], [2]])
+
+    def test_load_data_from_csv_gzip(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        with open(csv_test_filename, "rb") as csv_file:
+            compressed = io.BytesIO(gzip.compress(csv_file.read()))
+        self.assertEqual(load_data_from_csv(compressed), load_data_from_csv(csv_test_filename))
+
+    def test_normalize_columns(self):
+        rows = [
+            (1, {"bun": "0125", "pp_new_port": "7", "install_date": "2/1/21", "allow_skip": "TRUE", "cir": "1024"}),
+            (2, {"bun": "125", "pp_new_port": "49", "install_date": "2/30/21", "allow_skip": "FALSE", "cir": "1G"}),
+        ]
+        errors = normalize_columns(rows)
+
+        row = rows[0][1]
+        self.assertEqual((row["bun"], row["pp_new_port"], row["install_date"]), ("0125", 7, "2021-02-01"))
+        self.assertEqual((row["cir"], row["port_speed"], row["allow_skip"], row["review"]), (1024, 0, True, False))
+        self.assertEqual(rows[1][1]["bun"], "")
+        # Every error for the file, at once
+        self.assertEqual([(row_num, skippable) for row_num, _, skippable in errors], [(2, False)] * 3)
+        self.assertIn("Invalid Commit Rate (Kbps): 1G", errors[0][1])
+        self.assertIn("must be below 48", errors[1][1])
+
     ## FAILURES
     def test_load_data_from_csv_fail_notfound(self):
         csv_test_filename_notfound = "local/tests/test_bulk_circuits_notfound.csv"
@@ -551,6 +911,87 @@ class CircuitAdderTestCase(TestCase):
         # No errors
         self.assertFalse(any("ERROR" in log for log in logs.output))
 
+    def test_bulk_circuit_skip_unchanged(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        staged = NiceBulkCircuits.stage_csv(
+            logger=StandardCircuit(), overwrite=True, filename=csv_test_filename, circuit_num=2
+        )
+        results = NiceBulkCircuits.create_circuits(StandardCircuit(), staged, skip_unchanged=True)
+        self.assertTrue(results[staged[0].row_num]["result"])
+        circuit = Circuit.objects.get(cid="Circuit 1")
+        self.assertEqual(circuit.custom_field_data["import_hash"], staged[0].payload_hash())
+
+        # Re-import of the same row is skipped entirely
+        with self.assertLogs("netbox.scripts.scripts.nice_circuit_scripts.StandardCircuit", level="INFO") as logs:
+            results = NiceBulkCircuits.create_circuits(StandardCircuit(), staged, skip_unchanged=True)
+        self.assertEqual(results[staged[0].row_num]["result"], "unchanged")
+        self.assertFalse(any("Saved Circuit:" in log for log in logs.output))
+
+    def test_bulk_circuit_isolate_rows(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        staged = NiceBulkCircuits.stage_csv(logger=StandardCircuit(), filename=csv_test_filename, circuit_num=1)
+        duplicate = dataclasses.replace(staged[0], row_num=staged[0].row_num + 100)  # Same cid, other row
+
+        hydrated = mock.Mock()
+        hydrated.create.side_effect = [ValidationError("Invalid cable"), IntegrityError("Duplicate cable")]
+        with (
+            mock.patch.object(StagedCircuit, "hydrate", return_value=hydrated),
+            mock.patch("local.nice_circuits.find_cable_conflicts", return_value={}),
+        ):
+            results = NiceBulkCircuits.create_circuits(StandardCircuit(), staged + [duplicate], isolate_rows=True)
+
+        # Both rows failed on their own, reported separately
+        self.assertEqual(list(results), [staged[0].row_num, duplicate.row_num])
+        self.assertFalse(any(result["result"] for result in results.values()))
+
+    def test_bulk_circuit_overwrite_unchanged(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=True, filename=csv_test_filename, circuit_num=2
+        )
+        circuits[0].create()
+
+        # Same values again: nothing to snapshot or save
+        circuits = NiceBulkCircuits.from_csv(
+            logger=StandardCircuit(), overwrite=True, filename=csv_test_filename, circuit_num=2
+        )
+        with self.assertLogs("netbox.scripts.scripts.nice_circuit_scripts.StandardCircuit", level="INFO") as logs:
+            circuits[0].create_circuit()
+        self.assertTrue(any("Circuit 'Circuit 1' unchanged" in log for log in logs.output))
+        self.assertFalse(any("Saved Circuit:" in log for log in logs.output))
+
+    def test_bulk_circuits_fan_out(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        rows = NiceBulkCircuits.load_rows(filename=csv_test_filename)
+        # Site 1 (succeeds) & Site 3 (missing interface, skipped)
+        with InProcessQueue() as queue, mock.patch.object(queue, "enqueue", wraps=queue.enqueue) as enqueue:
+            jobs, parent = fan_out([rows[0], rows[3]], chunks=2, queue=queue, job_timeout=600, result_ttl=60)
+
+        self.assertEqual(len(jobs), 2)
+        # Chunk jobs & the parent job, none with RQ's default timeout
+        self.assertEqual(enqueue.call_count, 3)
+        for call in enqueue.call_args_list:
+            self.assertEqual((call.kwargs["job_timeout"], call.kwargs["result_ttl"]), (600, 60))
+        self.assertEqual(parent.result["rows"], 2)
+        self.assertEqual(parent.result["succeeded"], ["Circuit 21"])
+        self.assertEqual(parent.result["failed"], ["Circuit 24"])
+        self.assertNotIn(queue.name, LOCAL_QUEUES)  # Back to the RQ queues
+
+    def test_bulk_circuits_chunk_next_pp_ports(self):
+        csv_test_filename = "local/tests/test_bulk_circuits.csv"
+        (row_num, row) = NiceBulkCircuits.load_rows(filename=csv_test_filename, circuit_num=1)[0]
+        row.update(pp="Patch Panel 11", pp_new_port="next", create_pp_port="TRUE", direct_to_device="FALSE")
+        other = {**row, "cid": "Circuit 99", "interface": "Interface 2"}
+
+        # Two "next" ports on the same panel in one chunk: staged together, so never the same port
+        summary = import_chunk([(row_num, row), (row_num + 1, other)])
+        self.assertEqual(summary["succeeded"], ["Circuit 21", "Circuit 99"])
+        pp_ports = {
+            CircuitTermination.objects.get(circuit__cid=cid, term_side="A").cable.b_terminations[0].name
+            for cid in summary["succeeded"]
+        }
+        self.assertEqual(len(pp_ports), 2)
+
     ## WARNINGS
     def test_bulk_circuit_2_overwrite_circuit(self):
         csv_test_filename = "local/tests/test_bulk_circuits.csv"
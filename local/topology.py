@@ -0,0 +1,320 @@
+import hashlib
+from typing import NamedTuple
+
+from circuits.models import Circuit, CircuitTermination, CircuitType, ProviderNetwork
+from dcim.models import Cable, CableTermination, FrontPort, Interface, RearPort, Site
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+GRAPH_CACHE_KEY = "nice_circuits:topology:graph"
+GRAPH_VERSION_KEY = "nice_circuits:topology:graph_version"  # Bumped by invalidate_topology()
+GRAPH_TIMEOUT = 60 * 60 * 24  # Seconds
+MAX_HOPS = 4  # Termination -> Patch Panel -> Meet Me Patch Panel -> Interface, plus one spare
+
+# Cable endpoints, as (model, pk)
+TERMINATION = "circuittermination"
+INTERFACE = "interface"
+REAR_PORT = "rearport"
+FRONT_PORT = "frontport"
+ENDPOINT_MODELS = {
+    TERMINATION: CircuitTermination,
+    INTERFACE: Interface,
+    REAR_PORT: RearPort,
+    FRONT_PORT: FrontPort,
+}
+
+
+class Hop(NamedTuple):
+    """One cable of a path, leaving from the previous endpoint (termination or FrontPort)"""
+
+    cable_id: int
+    cable: str  # As str(Cable): label or #pk
+    color: str
+    near_end: str  # Cable end ("A"/"B") of the endpoint it leaves
+    far: tuple | None = None  # (model, pk) of the (first) termination on the other end, None if there is none
+    far_name: str = ""
+
+
+class CircuitPath(NamedTuple):
+    """
+    Cable path of one circuit termination, towards the device (see CircuitValidator.check_standard_cables):
+    Termination -> (RearPort/FrontPort of each Patch Panel) -> Interface
+    """
+
+    circuit_id: int
+    termination_id: int
+    term_side: str
+    ports: tuple = ()  # (model, pk) of each Patch Panel port crossed
+    cable_ids: tuple = ()
+    interface_id: int | None = None
+    hops: tuple[Hop, ...] = ()
+
+
+def _endpoint_types() -> dict[int, str]:
+    """ContentType pk -> endpoint model (ContentTypes are cached by Django)"""
+    return {ContentType.objects.get_for_model(model).pk: name for name, model in ENDPOINT_MODELS.items()}
+
+
+def _cable_ends(endpoints: set[tuple[str, int]], models: dict[int, str]) -> dict[tuple[str, int], tuple[int, str]]:
+    """
+    Returns:
+        {(model, pk): (cable_id, cable_end)} for the cabled endpoints, one query
+    """
+    by_model = {}
+    for model, pk in endpoints:
+        by_model.setdefault(model, set()).add(pk)
+    if not by_model:
+        return {}
+
+    type_ids = {model: type_id for type_id, model in models.items()}
+    query = Q()
+    for model, pks in by_model.items():
+        query |= Q(termination_type_id=type_ids[model], termination_id__in=pks)
+
+    return {
+        (models[type_id], pk): (cable_id, cable_end)
+        for type_id, pk, cable_id, cable_end in CableTermination.objects.filter(query).values_list(
+            "termination_type_id", "termination_id", "cable_id", "cable_end"
+        )
+    }
+
+
+def _endpoint_names(endpoints: set[tuple[str, int]]) -> dict[tuple[str, int], str]:
+    """Names of the endpoints, as str() of the objects, one query per model"""
+    names = {}
+    name_fields = {INTERFACE: "name", REAR_PORT: "name", FRONT_PORT: "name", TERMINATION: "term_side"}
+    for model, name_field in name_fields.items():
+        pks = {pk for endpoint_model, pk in endpoints if endpoint_model == model}
+        if not pks:
+            continue
+        for pk, name in ENDPOINT_MODELS[model].objects.filter(pk__in=pks).values_list("pk", name_field):
+            names[(model, pk)] = name if model != TERMINATION else f"Termination {name}"
+    return names
+
+
+def _front_port(ports: list[tuple[int, int | None]]) -> int | None:
+    """
+    The FrontPort a path goes on with from its RearPort, out of the RearPort's (FrontPort pk, cable_id):
+    its only cabled one, else the first position (the path stops there, not cabled yet).
+    None when several positions of a cassette are cabled: the trunk cable alone doesn't tell which one the path takes.
+    """
+    cabled = [pk for pk, cable_id in ports if cable_id] or [ports[0][0]]
+    return cabled[0] if len(cabled) == 1 else None
+
+
+def trace_paths(circuit_ids: set[int] = None) -> list[CircuitPath]:
+    """
+    Trace the cable paths of every cabled circuit termination (or of the given circuits only),
+    hop by hop in bulk: a constant number of queries per hop, whatever the number of circuits.
+
+    A path stops at the device Interface, or where the cabling stops/is unsupported (see CircuitPath.hops),
+    e.g. a cassette with several positions cabled (see _front_port)
+    """
+    terminations = CircuitTermination.objects.filter(cable__isnull=False)
+    if circuit_ids is not None:
+        terminations = terminations.filter(circuit_id__in=circuit_ids)
+
+    models = _endpoint_types()
+    frontier = [
+        (CircuitPath(circuit_id, pk, term_side), (TERMINATION, pk))
+        for pk, circuit_id, term_side in terminations.values_list("pk", "circuit_id", "term_side")
+    ]
+
+    paths = []
+    for _ in range(MAX_HOPS):
+        if not frontier:
+            break
+        ends = _cable_ends({endpoint for _, endpoint in frontier}, models)
+
+        # Far end of each cable (first termination, see CircuitValidator), and the FrontPort of every RearPort reached
+        cable_ids = {cable_id for cable_id, _ in ends.values()}
+        cables = {
+            pk: (label or f"#{pk}", color)
+            for pk, label, color in Cable.objects.filter(pk__in=cable_ids).values_list("pk", "label", "color")
+        }
+        far_ends = {}
+        for cable_id, cable_end, type_id, pk in (
+            CableTermination.objects.filter(cable_id__in=cable_ids)
+            .order_by("pk")
+            .values_list("cable_id", "cable_end", "termination_type_id", "termination_id")
+        ):
+            model = models.get(type_id) or ContentType.objects.get_for_id(type_id).model
+            far_ends.setdefault((cable_id, cable_end), (model, pk))
+        names = _endpoint_names(set(far_ends.values()))
+        rear_port_ids = {pk for model, pk in far_ends.values() if model == REAR_PORT}
+        positions = {}
+        for rear_port_id, pk, cable_id in (
+            FrontPort.objects.filter(rear_port_id__in=rear_port_ids)
+            .order_by("rear_port_position")
+            .values_list("rear_port_id", "pk", "cable_id")
+        ):
+            positions.setdefault(rear_port_id, []).append((pk, cable_id))
+        front_ports = {rear_port_id: _front_port(ports) for rear_port_id, ports in positions.items()}
+
+        next_frontier = []
+        for path, endpoint in frontier:
+            if endpoint not in ends:
+                paths.append(path)  # Not cabled (yet)
+                continue
+            cable_id, cable_end = ends[endpoint]
+            far = far_ends.get((cable_id, "B" if cable_end == "A" else "A"))
+            cable, color = cables.get(cable_id, (f"#{cable_id}", ""))
+            hop = Hop(cable_id, cable, color, cable_end, far, names.get(far, ""))
+            path = path._replace(cable_ids=path.cable_ids + (cable_id,), hops=path.hops + (hop,))
+            model, pk = far or (None, None)
+
+            if model == INTERFACE:
+                paths.append(path._replace(interface_id=pk))
+            elif model == REAR_PORT and front_ports.get(pk):
+                front_port = (FRONT_PORT, front_ports[pk])
+                next_frontier.append((path._replace(ports=path.ports + ((REAR_PORT, pk), front_port)), front_port))
+            else:
+                paths.append(path)  # Unsupported/missing far end, see CircuitValidator
+        frontier = next_frontier
+
+    return paths + [path for path, _ in frontier]
+
+
+class TerminationNode(NamedTuple):
+    pk: int
+    circuit: str  # Circuit ID (cid)
+    term_side: str
+    site_id: int | None
+    site: str
+    provider_network_id: int | None
+    provider_network: str
+    cable_id: int | None
+    path: CircuitPath | None  # Cabled terminations only
+
+    def __str__(self) -> str:
+        return f"{self.circuit}: Termination {self.term_side}"
+
+
+class CircuitNode(NamedTuple):
+    pk: int
+    cid: str
+    type: str  # Circuit Type name
+    terminations: dict  # term_side -> TerminationNode
+
+    def __str__(self) -> str:
+        return self.cid
+
+
+class TopologyGraph:
+    """
+    Compact adjacency structure of the circuits (circuit -> terminations -> cable path -> patch panels -> interface),
+    built in bulk for a set of sites or the whole inventory, and cached until cables, ports, terminations, circuits
+    or the names it holds change (see invalidate_topology).
+
+    The validator, reports and lookup tools read from it instead of walking the ORM per circuit.
+    """
+
+    def __init__(self, circuits: dict[int, CircuitNode]):
+        self.circuits = circuits
+        self.interfaces = {}
+        for circuit in circuits.values():
+            for termination in circuit.terminations.values():
+                if termination.path and termination.path.interface_id:
+                    self.interfaces.setdefault(termination.path.interface_id, []).append(termination.path)
+
+    @classmethod
+    def build(cls, circuit_ids: set[int] = None, trace: bool = True) -> "TopologyGraph":
+        """
+        Build the graph of every circuit (or of the given circuits only), without the cache
+
+        trace: False to skip the cable paths (terminations only, no path on the TerminationNodes)
+        """
+        circuits = Circuit.objects.all() if circuit_ids is None else Circuit.objects.filter(pk__in=circuit_ids)
+        paths = {(path.circuit_id, path.term_side): path for path in trace_paths(circuit_ids)} if trace else {}
+
+        terminations = {}
+        query = CircuitTermination.objects.all() if circuit_ids is None else CircuitTermination.objects.filter(
+            circuit_id__in=circuit_ids
+        )
+        rows = query.values_list(
+            "pk",
+            "circuit__cid",
+            "circuit_id",
+            "term_side",
+            "site_id",
+            "site__name",
+            "provider_network_id",
+            "provider_network__name",
+            "cable_id",
+        )
+        for pk, cid, circuit_id, term_side, site_id, site, provider_network_id, provider_network, cable_id in rows:
+            terminations.setdefault(circuit_id, {})[term_side] = TerminationNode(
+                pk,
+                cid,
+                term_side,
+                site_id,
+                site or "",
+                provider_network_id,
+                provider_network or "",
+                cable_id,
+                paths.get((circuit_id, term_side)),
+            )
+
+        return cls(
+            {
+                pk: CircuitNode(pk, cid, circuit_type, terminations.get(pk, {}))
+                for pk, cid, circuit_type in circuits.values_list("pk", "cid", "type__name")
+            }
+        )
+
+    @classmethod
+    def load(cls, site_ids: set[int] = None, trace: bool = True) -> "TopologyGraph":
+        """
+        Graph of the circuits terminated in the given sites (or of the whole inventory), from the cache if still valid
+
+        trace: see build()
+        """
+        # Hashed: a large region selection would exceed the cache key limits (250 bytes for memcached)
+        scope = hashlib.sha256(",".join(str(pk) for pk in sorted(site_ids)).encode()).hexdigest() if site_ids else "all"
+        scope = scope if trace else f"{scope}:untraced"
+        key = f"{GRAPH_CACHE_KEY}:{cache.get_or_set(GRAPH_VERSION_KEY, 1, None)}:{scope}"
+        graph = cache.get(key)
+        if graph is None:
+            circuit_ids = None
+            if site_ids:
+                circuit_ids = set(
+                    CircuitTermination.objects.filter(site_id__in=site_ids).values_list("circuit_id", flat=True)
+                )
+            graph = cls.build(circuit_ids, trace)
+            cache.set(key, graph, GRAPH_TIMEOUT)
+        return graph
+
+    def lookup_interface(self, interface_id: int) -> list[CircuitPath]:
+        """Circuit path(s) ending on a device Interface (no query)"""
+        return self.interfaces.get(interface_id, [])
+
+
+@receiver(post_save, sender=Cable, dispatch_uid="nice_topology_cable_saved")
+@receiver(post_delete, sender=Cable, dispatch_uid="nice_topology_cable_deleted")
+@receiver(post_save, sender=CableTermination, dispatch_uid="nice_topology_cable_termination_saved")
+@receiver(post_delete, sender=CableTermination, dispatch_uid="nice_topology_cable_termination_deleted")
+@receiver(post_save, sender=CircuitTermination, dispatch_uid="nice_topology_termination_saved")
+@receiver(post_delete, sender=CircuitTermination, dispatch_uid="nice_topology_termination_deleted")
+@receiver(post_save, sender=FrontPort, dispatch_uid="nice_topology_front_port_saved")
+@receiver(post_delete, sender=FrontPort, dispatch_uid="nice_topology_front_port_deleted")
+@receiver(post_save, sender=RearPort, dispatch_uid="nice_topology_rear_port_saved")
+@receiver(post_delete, sender=RearPort, dispatch_uid="nice_topology_rear_port_deleted")
+@receiver(post_save, sender=Circuit, dispatch_uid="nice_topology_circuit_saved")
+@receiver(post_delete, sender=Circuit, dispatch_uid="nice_topology_circuit_deleted")
+@receiver(post_save, sender=CircuitType, dispatch_uid="nice_topology_circuit_type_saved")
+@receiver(post_delete, sender=CircuitType, dispatch_uid="nice_topology_circuit_type_deleted")
+@receiver(post_save, sender=Site, dispatch_uid="nice_topology_site_saved")
+@receiver(post_delete, sender=Site, dispatch_uid="nice_topology_site_deleted")
+@receiver(post_save, sender=ProviderNetwork, dispatch_uid="nice_topology_provider_network_saved")
+@receiver(post_delete, sender=ProviderNetwork, dispatch_uid="nice_topology_provider_network_deleted")
+@receiver(post_save, sender=Interface, dispatch_uid="nice_topology_interface_saved")
+@receiver(post_delete, sender=Interface, dispatch_uid="nice_topology_interface_deleted")
+def invalidate_topology(**kwargs) -> None:
+    """Cables, ports, terminations, circuits or the names held by the graph changed: every cached graph is stale"""
+    try:
+        cache.incr(GRAPH_VERSION_KEY)
+    except ValueError:
+        cache.set(GRAPH_VERSION_KEY, 1, None)
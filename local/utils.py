@@ -1,6 +1,16 @@
-import codecs
 import csv
+import datetime
+import functools
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
 import re
+import time
+from collections import defaultdict
+from itertools import islice
 
 import dateutil.parser as date_parser
 from circuits.choices import CircuitStatusChoices
@@ -13,21 +23,42 @@ from circuits.models import (
 )
 from dateutil.parser import ParserError
 from dcim.choices import CableTypeChoices, PortTypeChoices
+from dcim.constants import REARPORT_POSITIONS_MAX
 from dcim.models import Cable, Device, FrontPort, Interface, RearPort, Site
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files import File
+from django.db.models import Prefetch
+from extras.models import CustomField
 from extras.scripts import Script
-from local.display_fields import HEADER_MAPPING
+from local.display_fields import HEADER_MAPPING, customs
+from local.reference_cache import ReferenceCache
 from local.validators import CircuitValidator
 from utilities.exceptions import AbortScript
 
 BULK_SCRIPT_ALLOWED_USERS = ["netbox"]
+CHECKPOINT_INTERVAL = 100  # Rows
+CHECKPOINT_TIMEOUT = 60 * 60 * 24 * 7  # Seconds
+PROGRESS_INTERVAL = 30  # Seconds between two progress status lines
+BUN_PATTERN = re.compile(r"^\d{4}$")
+GZIP_MAGIC = b"\x1f\x8b"
+IMPORT_HASH_FIELD = "import_hash"  # Circuit custom field (Text) holding the hash of the last imported CSV row
+MAX_PP_PORT = 48
+NEXT_PP_PORT = "next"  # "PP New Port" value asking for the Patch Panel's next free port
+REAR_PORT_NUMBER = re.compile(r"^Rear(\d+)$")
+REFERENCE_CACHE = customs.get("reference_cache", False)  # See get_reference_cache()
 
 
-def generate_range(input_string):
-    # Convert the input string to an integer
-    num = int(input_string)
+# Read once at import, see reset_bun_cache() if the setting changes
+BUN_ROOT_PATH = customs["bun_root_path"]
+
 
+@functools.lru_cache(maxsize=None)
+def bun_range(num: int) -> tuple[str, str]:
+    """
+    The 50 wide BUN folder range (start, end) containing num, memoized (only 9,999 possible BUNs)
+    """
     # Calculate the start and end values for the range
     start = num - (num % 50) + 1
     end = start + 49
@@ -37,39 +68,61 @@ def generate_range(input_string):
     end = min(end, 9999)
 
     # Pad the start and end strings with zeros to ensure they have the same length
-    start_str = str(start).zfill(4)
-    end_str = str(end).zfill(4)
+    return str(start).zfill(4), str(end).zfill(4)
+
+
+@functools.lru_cache(maxsize=None)
+def _bun_link(num: int) -> str:
+    start_str, end_str = bun_range(num)
+    return f"{BUN_ROOT_PATH}\\{start_str} - {end_str}\\"
+
+
+def reset_bun_cache(root_path: str = None) -> None:
+    """
+    Clear the memoized BUN ranges/links, optionally switching to a new bun_root_path
+    """
+    global BUN_ROOT_PATH
+    BUN_ROOT_PATH = root_path if root_path is not None else customs["bun_root_path"]
+    bun_range.cache_clear()
+    _bun_link.cache_clear()
 
-    return start_str, end_str
+
+def generate_range(input_string):
+    return bun_range(int(input_string))
 
 
 def is_four_digit_numeric(string):
-    # Define a regular expression pattern to match exactly 4 digits
-    pattern = r'^\d{4}$'
-    # Use the match function to check if the string matches the pattern
-    return bool(re.match(pattern, string))
+    # Match exactly 4 digits
+    return bool(BUN_PATTERN.match(string))
 
 
 def get_bun_link(bun: str) -> str:
-    # Convert the input string to an integer
-    num = int(bun)
+    return _bun_link(int(bun))
 
-    # Calculate the start and end values for the range
-    start = num - (num % 50) + 1
-    end = start + 49
 
-    # Ensure that the start and end values are within the valid range of 4-digit numbers
-    start = max(start, 1)
-    end = min(end, 9999)
+class ScriptLogger:
+    """
+    Stand-in for a Script's log_* methods (as used by NiceCircuit), when running outside of a Script.
+    Messages go to the python logger `name`.
+    """
 
-    # Pad the start and end strings with zeros to ensure they have the same length
-    start_str = str(start).zfill(4)
-    end_str = str(end).zfill(4)
+    def __init__(self, name: str = "netbox.scripts.nice_circuits"):
+        self.logger = logging.getLogger(name)
+
+    def log_debug(self, message):
+        self.logger.debug(message)
+
+    def log_info(self, message):
+        self.logger.info(message)
+
+    def log_success(self, message):
+        self.logger.info(message)
 
-    from local.display_fields import customs
+    def log_warning(self, message):
+        self.logger.warning(message)
 
-    bun_link = f"{customs['bun_root_path']}\\{start_str} - {end_str}\\"
-    return bun_link
+    def log_failure(self, message):
+        self.logger.error(message)
 
 
 def handle_errors(logger: Script, error: str, skip: bool = False):
@@ -88,18 +141,146 @@ def fix_bools(value) -> None:
     return value.lower() == "true"
 
 
+# Fast paths for the date formats seen in practice (ISO & the US CSV exports), anything else goes to dateutil
+ISO_DATE = re.compile(r"^\s*(\d{4})-(\d{1,2})-(\d{1,2})\s*$")
+US_DATE = re.compile(r"^\s*(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})\s*$")
+
+
+def _convert_two_digit_year(year: int) -> int:
+    """
+    Expand a 2 digit year the same way dateutil does (closest century within 50 years of today)
+    """
+    this_year = datetime.date.today().year
+    year += this_year - this_year % 100
+    if year >= this_year + 50:
+        year -= 100
+    elif year < this_year - 50:
+        year += 100
+    return year
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date_str: str) -> datetime.date:
+    """
+    Parse a date string, memoized since bulk files repeat the same few dates
+    """
+    if match := ISO_DATE.match(date_str):
+        year, month, day = (int(x) for x in match.groups())
+    elif match := US_DATE.match(date_str):
+        month, day, year = (int(x) for x in match.groups())
+        if len(match.group(3)) == 2:
+            year = _convert_two_digit_year(year)
+    else:
+        return date_parser.parse(date_str).date()
+
+    return datetime.date(year, month, day)
+
+
 def validate_date(date_str: str) -> str:
     """
     Validate the date string format and return the ISO formatted date.
     """
     error = f"Invalid date ({date_str}), should be YYYY-MM-DD"
     try:
-        date = date_parser.parse(date_str)
-        if not 1980 <= date.year <= 2036:
-            raise AbortScript(f"Date: {date_str} is outside constraints: Minimum year: 1980, Maximum year: 2036")
-    except (ParserError, ValueError, TypeError):
+        date = _parse_date(date_str)
+    except (ParserError, ValueError, TypeError, OverflowError):
         raise AbortScript(error)
-    return date.date().isoformat()
+    if not 1980 <= date.year <= 2036:
+        raise AbortScript(f"Date: {date_str} is outside constraints: Minimum year: 1980, Maximum year: 2036")
+    return date.isoformat()
+
+
+# CSV columns normalized by normalize_columns()
+BOOL_COLUMNS = (
+    "direct_to_device",
+    "create_pp_port",
+    "review",
+    "allow_skip",
+    "overwrite",
+    "z_direct_to_device",
+    "z_create_pp_port",
+    "mm_create_pp_port",
+)
+NUMERIC_COLUMNS = ("port_speed", "upstream_speed", "cir")
+# FrontPort position on a multi-position (cassette) RearPort, and the positions of a new Patch Panel Port
+POSITION_COLUMNS = ("pp_port_position", "pp_port_positions", "z_pp_port_position", "z_pp_port_positions")
+NEW_PORT_COLUMNS = ("pp_new_port", "z_pp_new_port", "mm_pp_new_port")
+
+
+def normalize_columns(rows: list[tuple[int, dict]]) -> list[tuple[int, str, bool]]:
+    """
+    Normalize parsed CSV rows in place, column by column (bools, BUN, numeric defaults,
+    new Patch Panel Ports & install dates), before any NiceCircuit is built.
+
+    Returns:
+        Every error found, as (row_num, error, skippable (the row allows skipping))
+    """
+    errors = []
+    records = [row for _, row in rows]
+
+    for column in BOOL_COLUMNS:
+        for row in records:
+            row[column] = fix_bools(row.get(column) or False)
+
+    bun_match = BUN_PATTERN.match
+    for row in records:
+        bun = row.get("bun") or ""
+        row["bun"] = bun if bun_match(bun) else ""
+
+    # Stored as ints, compared with the saved values on overwrites (see update_changed_fields)
+    headers = {field: header for header, field in HEADER_MAPPING.items()}
+    for column in NUMERIC_COLUMNS:
+        for row_num, row in rows:
+            value = str(row.get(column) or "").strip()
+            row[column] = 0
+            if not value:
+                continue
+            if not value.isnumeric():
+                errors.append((row_num, f"Invalid {headers.get(column, column)}: {value}", row["allow_skip"]))
+            else:
+                row[column] = int(value)
+
+    for column in POSITION_COLUMNS:
+        for row_num, row in rows:
+            position = str(row.get(column) or "").strip()
+            row[column] = 1
+            if not position:
+                continue
+            if not position.isnumeric() or not 1 <= int(position) <= REARPORT_POSITIONS_MAX:
+                errors.append((row_num, f"Invalid Patch Panel Port position: {position}", row["allow_skip"]))
+            else:
+                row[column] = int(position)
+
+    for column in NEW_PORT_COLUMNS:
+        for row_num, row in rows:
+            port_num = str(row.get(column) or "")
+            row[column] = ""
+            if not port_num:
+                continue
+            if port_num.strip().lower() == NEXT_PP_PORT:
+                row[column] = NEXT_PP_PORT
+            elif not port_num.isnumeric():
+                errors.append((row_num, f"Invalid value for new Patch Panel Port: {port_num}", row["allow_skip"]))
+            elif int(port_num) > MAX_PP_PORT:
+                errors.append((row_num, f"New Patch Panel Port must be below 48: {port_num}", row["allow_skip"]))
+            else:
+                row[column] = int(port_num)
+
+    # Parsed once per distinct date
+    dates = {}
+    for value in {row.get("install_date") for row in records}:
+        try:
+            dates[value] = validate_date(value)
+        except AbortScript as e:
+            dates[value] = e
+    for row_num, row in rows:
+        date = dates[row.get("install_date")]
+        if isinstance(date, AbortScript):
+            errors.append((row_num, str(date), False))
+            date = ""
+        row["install_date"] = date
+
+    return sorted(errors, key=lambda error: error[0])
 
 
 def validate_user(user) -> bool:
@@ -178,6 +359,28 @@ def get_rearport_by_name(name: str, device: Device = None) -> RearPort | None:
     return RearPort.objects.filter(name=name).first()
 
 
+def get_pk_by_name(model, name: str, references: ReferenceCache = None, **filters) -> int | None:
+    """
+    Retrieve only the primary key of a model instance by name.
+    Filters that are None are ignored, matching the get_*_by_name helpers above.
+
+    references: Answer from the cached name -> id maps when they cover the lookup (see get_reference_cache)
+    """
+    if not name:
+        return None
+    filters = {k: v for k, v in filters.items() if v is not None}
+    if references is not None and references.covers(model, filters):
+        return references.get_pk(model, name, **filters)
+    return model.objects.filter(name=name, **filters).values_list("pk", flat=True).first()
+
+
+def get_reference_cache() -> ReferenceCache | None:
+    """
+    A ReferenceCache for one run if enabled (customs["reference_cache"]), None otherwise
+    """
+    return ReferenceCache() if REFERENCE_CACHE else None
+
+
 def get_side_by_name(side_site, side_providernetwork) -> Site | ProviderNetwork:
     """
     Retrieve a site or provider network by name.
@@ -188,33 +391,214 @@ def get_side_by_name(side_site, side_providernetwork) -> Site | ProviderNetwork:
     return side
 
 
-def load_data_from_csv(filename) -> list[dict]:
+def open_csv(filename) -> tuple[io.TextIOWrapper, bool]:
     """
-    Load data from a CSV file and map header names to new names.
+    Open a CSV for streaming as text, from a path or any file-like upload.
+    Uploads spooled to disk (TemporaryUploadedFile) are read incrementally from their temporary file,
+    and gzip compressed CSVs are decompressed on the fly.
+
+    Returns:
+        The text stream, and whether it was opened here (and should be closed)
     """
-    if not isinstance(filename, InMemoryUploadedFile):
+    if isinstance(filename, (str, os.PathLike)):
         try:
-            csv_file = open(filename, "rb")
+            raw, opened = open(filename, "rb"), True
         except FileNotFoundError:
             raise AbortScript(f"File '{filename}' not found!")
+    elif isinstance(filename, File):
+        # Django uploads, in memory (BytesIO) or on disk (temporary file)
+        raw, opened = filename.file, False
+    elif hasattr(filename, "read"):
+        raw, opened = filename, False
     else:
-        csv_file = filename
+        raise AbortScript(f"Unsupported CSV file: {filename}")
+
+    if getattr(raw, "seekable", lambda: False)():
+        raw.seek(0)
+        magic = raw.read(2)
+        raw.seek(0)
+        if magic == GZIP_MAGIC:
+            raw = gzip.GzipFile(fileobj=raw)
 
-    circuits_csv = csv.DictReader(codecs.iterdecode(csv_file, "utf-8-sig"))
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""), opened
 
-    csv_data = []
-    for row in circuits_csv:
-        csv_row = {}
-        for old_header, value in row.items():
-            if old_header in HEADER_MAPPING:
-                csv_row[HEADER_MAPPING[old_header]] = value
-                for old_header, new_header in HEADER_MAPPING.items():
-                    if not csv_row.get(new_header):
-                        csv_row[new_header] = ""
-        if csv_row:
-            csv_data.append(csv_row)
 
-    return csv_data
+def iter_data_from_csv(filename):
+    """
+    Stream rows from a CSV file, mapping header names to new names.
+    """
+    csv_file, opened = open_csv(filename)
+
+    try:
+        for row in csv.DictReader(csv_file):
+            csv_row = {HEADER_MAPPING[header]: value for header, value in row.items() if header in HEADER_MAPPING}
+            if csv_row:
+                # Every mapped column is always present
+                yield {new_header: csv_row.get(new_header) or "" for new_header in HEADER_MAPPING.values()}
+    finally:
+        if opened:
+            csv_file.close()
+        else:
+            # Leave the caller's file open
+            csv_file.detach()
+
+
+def load_data_from_csv(filename) -> list[dict]:
+    """
+    Load data from a CSV file and map header names to new names.
+    """
+    return list(iter_data_from_csv(filename))
+
+
+def chunks(iterable, size: int):
+    """Lists of `size` items (the last one shorter) from any iterable, consumed lazily"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def rows_hash(rows: list[tuple[int, dict]]) -> str:
+    """
+    Content hash of the loaded CSV rows, identifies the same file across runs
+    """
+    digest = hashlib.sha256()
+    for row_num, row in rows:
+        digest.update(json.dumps([row_num, row], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class BulkCheckpoint:
+    """
+    Progress (last row done) of a bulk import, saved to the Django cache every `interval` rows,
+    keyed by the CSV's content hash so a rerun of the same file can resume after it.
+
+    The last circuit saved is kept as a witness: if its write was rolled back (the job died inside
+    its transaction), the checkpoint is discarded and the file is imported from the start.
+    """
+
+    def __init__(self, file_hash: str, interval: int = CHECKPOINT_INTERVAL, **options):
+        """options: the import options changing the outcome of the rows (e.g. overwrite), part of the key"""
+        scope = ",".join(f"{name}={value}" for name, value in sorted(options.items()))
+        self.key = f"nice_bulk_circuits:checkpoint:{file_hash}:{scope}"
+        self.interval = interval
+        self.last_row = 0
+        self._witness = None
+        self._unsaved = 0
+
+    def load(self) -> int:
+        """
+        Returns the last row done by a previous run of this file, 0 if none (or if it was rolled back)
+        """
+        saved = cache.get(self.key)
+        if not saved:
+            return 0
+
+        if saved["witness"]:
+            pk, last_updated = saved["witness"]
+            if not Circuit.objects.filter(pk=pk, last_updated__gte=last_updated).exists():
+                self.clear()
+                return 0
+
+        self.last_row = saved["row"]
+        self._witness = saved["witness"]
+        return self.last_row
+
+    def update(self, row_num: int, circuit: Circuit = None) -> None:
+        """Mark row_num as done, circuit being the Circuit it saved (if any)"""
+        self.last_row = row_num
+        if circuit is not None and circuit.pk:
+            self._witness = (circuit.pk, circuit.last_updated)
+        self._unsaved += 1
+        if self._unsaved >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        cache.set(self.key, {"row": self.last_row, "witness": self._witness}, CHECKPOINT_TIMEOUT)
+        self._unsaved = 0
+
+    def clear(self) -> None:
+        cache.delete(self.key)
+
+
+class ProgressReporter:
+    """
+    Status line of a long script run, logged every `interval` seconds at most:
+    current phase, rows done/total, rows per second, ETA & failures so far.
+
+    Costs a counter increment and a clock read per row, cheap enough to be always on.
+    """
+
+    def __init__(self, log, interval: float = PROGRESS_INTERVAL):
+        self.log = log
+        self.interval = interval
+        self.phases = {}  # Finished phases: {phase: (rows, failures, seconds)}
+        self.phase = None
+
+    def start(self, phase: str, total: int) -> None:
+        """Start a phase of `total` rows, ending the current one"""
+        self.finish()
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.failures = 0
+        self.started = self._logged = time.monotonic()
+
+    def update(self, rows: int = 1, failed: bool = False) -> None:
+        """Count rows done (failed or not), logging the status line once the interval elapsed"""
+        self.done += rows
+        if failed:
+            self.failures += rows
+        now = time.monotonic()
+        if now - self._logged >= self.interval:
+            self._logged = now
+            self.log(self.status(now))
+
+    def status(self, now: float = None) -> str:
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = datetime.timedelta(seconds=round((self.total - self.done) / rate)) if rate else "?"
+        return f"{self.phase}: {self.done}/{self.total} rows, {rate:.1f} rows/s, ETA {eta}, {self.failures} failures"
+
+    def finish(self) -> None:
+        """End the current phase, keeping its throughput for summary()"""
+        if self.phase is None:
+            return
+        self.phases[self.phase] = (self.done, self.failures, time.monotonic() - self.started)
+        self.phase = None
+
+    def summary(self) -> str:
+        """Throughput of each phase, one line per phase"""
+        self.finish()
+        lines = []
+        for phase, (rows, failures, seconds) in self.phases.items():
+            rate = rows / seconds if seconds else 0.0
+            lines.append(f"{phase}: {rows} rows in {seconds:.1f}s ({rate:.1f} rows/s), {failures} failures")
+        return "\n".join(lines)
+
+
+def has_custom_field(name: str, model) -> bool:
+    """
+    Check if a custom field exists for the model.
+    """
+    return CustomField.objects.filter(name=name, content_types=ContentType.objects.get_for_model(model)).exists()
+
+
+def get_import_hashes(cids: set[str]) -> dict[tuple[str, int], str]:
+    """
+    Retrieve the stored import hash of existing circuits, by (cid, provider_id).
+    """
+    circuits = Circuit.objects.filter(cid__in=cids).values_list(
+        "cid", "provider_id", f"custom_field_data__{IMPORT_HASH_FIELD}"
+    )
+    return {(cid, provider_id): import_hash for cid, provider_id, import_hash in circuits}
+
+
+def save_import_hash(circuit: Circuit, import_hash: str) -> None:
+    """
+    Store the import hash on a circuit (bookkeeping only, no change log entry).
+    """
+    circuit.custom_field_data[IMPORT_HASH_FIELD] = import_hash
+    Circuit.objects.filter(pk=circuit.pk).update(custom_field_data=circuit.custom_field_data)
 
 
 def _pp_port_update(logger, port, old, new, revert_if_failed) -> None:
@@ -265,7 +649,53 @@ def pp_port_update(
     return pp
 
 
-def create_rearport(name: str, type: PortTypeChoices, pp: Device, description: str = "") -> RearPort:
+class FreePortIndex:
+    """
+    Patch Panel port numbers in use (RearN) per panel, loaded with one query per site.
+
+    New ports are handed out deterministically: the panel's next number after every port in use, requested
+    (see reserve) or already handed out by this index, so rows of the same run never collide.
+    Lower gaps are left alone, create_extra_pp_ports() fills them when the new port is created.
+    """
+
+    def __init__(self):
+        self.used = defaultdict(set)
+        self._loaded = set()
+
+    def _load(self, pp_id: int, site_id: int | None) -> None:
+        # By site (one query for all its panels), or by panel if the site is unknown
+        key = ("site", site_id) if site_id else ("device", pp_id)
+        if key in self._loaded:
+            return
+        self._loaded.add(key)
+
+        ports = RearPort.objects.filter(device__site_id=site_id) if site_id else RearPort.objects.filter(device_id=pp_id)
+        for device_id, name in ports.values_list("device_id", "name"):
+            match = REAR_PORT_NUMBER.match(name)
+            if match:
+                self.used[device_id].add(int(match.group(1)))
+
+    def reserve(self, pp_id: int, site_id: int | None, port_num: int) -> None:
+        """Mark a requested port number as used"""
+        self._load(pp_id, site_id)
+        self.used[pp_id].add(port_num)
+
+    def allocate(self, pp_id: int, site_id: int | None) -> int | None:
+        """
+        Returns:
+            The next free port number of the panel (now used), None if the panel is full
+        """
+        self._load(pp_id, site_id)
+        port_num = max(self.used[pp_id], default=0) + 1
+        if port_num > MAX_PP_PORT:
+            return None
+        self.used[pp_id].add(port_num)
+        return port_num
+
+
+def create_rearport(
+    name: str, type: PortTypeChoices, pp: Device, description: str = "", positions: int = 1
+) -> RearPort:
     # if not pp:
     #     handle_errors(logger, )
     return RearPort(
@@ -273,21 +703,137 @@ def create_rearport(name: str, type: PortTypeChoices, pp: Device, description: s
         type=type,
         device=pp,
         description=description,
+        positions=positions,
     )
 
 
 def create_frontport(
-    name: str, type: PortTypeChoices, pp: Device, rear_port: RearPort, description: str = ""
+    name: str,
+    type: PortTypeChoices,
+    pp: Device,
+    rear_port: RearPort,
+    description: str = "",
+    rear_port_position: int = 1,
 ) -> FrontPort:
     return FrontPort(
         name=name,
         type=type,
         device=pp,
         rear_port=rear_port,
+        rear_port_position=rear_port_position,
         description=description,
     )
 
 
+def get_frontport_map(pp_id: int) -> dict[tuple[int, int], FrontPort]:
+    """
+    FrontPorts of a Patch Panel by (RearPort pk, position), one query for the whole panel
+    """
+    return {
+        (front_port.rear_port_id, front_port.rear_port_position): front_port
+        for front_port in FrontPort.objects.filter(device_id=pp_id)
+    }
+
+
+class IdentityMap:
+    """
+    Run-scoped identity map shared by every NiceCircuit of a bulk run: each netbox row is loaded at most once
+    per run (in bulk, see load), and every circuit gets the same instance. Related objects (rear_port.device,
+    device.site, ...) are wired to the shared instances, so the accessors don't query again.
+    """
+
+    # model -> (attribute, related model) wired to the shared instances
+    RELATIONS = {
+        Device: (("site", Site),),
+        Interface: (("device", Device),),
+        RearPort: (("device", Device),),
+        FrontPort: (("device", Device), ("rear_port", RearPort)),
+        ProviderNetwork: (("provider", Provider),),
+    }
+
+    def __init__(self):
+        self.objects = {}
+        self.frontport_maps = {}
+
+    def load(self, model, pks) -> None:
+        """Load the rows of a model not loaded yet (and their related objects), one query per model"""
+        missing = {pk for pk in pks if pk and (model, pk) not in self.objects}
+        if missing:
+            self._add(model, model.objects.in_bulk(missing).values())
+
+    def _add(self, model, objs) -> None:
+        objs = [self.objects.setdefault((model, obj.pk), obj) for obj in objs]
+        for attribute, related in self.RELATIONS.get(model, ()):
+            field = f"{attribute}_id"
+            self.load(related, {getattr(obj, field) for obj in objs})
+            for obj in objs:
+                related_obj = self.objects.get((related, getattr(obj, field)))
+                if related_obj is not None:
+                    setattr(obj, attribute, related_obj)
+
+    def get(self, model, pk):
+        if not pk:
+            return None
+        self.load(model, {pk})
+        return self.objects.get((model, pk))
+
+    def frontport_map(self, pp_id: int) -> dict[tuple[int, int], FrontPort]:
+        """The Patch Panel FrontPorts by (RearPort pk, position), see get_frontport_map"""
+        if pp_id not in self.frontport_maps:
+            front_ports = get_frontport_map(pp_id)
+            self._add(FrontPort, front_ports.values())
+            self.frontport_maps[pp_id] = {key: self.objects[(FrontPort, port.pk)] for key, port in front_ports.items()}
+        return self.frontport_maps[pp_id]
+
+    def forget_frontports(self, pp_id: int) -> None:
+        """Patch Panel ports were created: reload its FrontPorts on next use"""
+        self.frontport_maps.pop(pp_id, None)
+
+    def refresh_cables(self, cables: list) -> None:
+        """
+        Cables were saved: netbox sets the cable of their terminations with a queryset update,
+        reload it on the instances cabled (and the shared ones), so the next rows see them cabled
+        """
+        for cable in cables:
+            if not cable or not cable.pk:
+                continue
+            for termination in [*cable.a_terminations, *cable.b_terminations]:
+                shared = self.objects.get((type(termination), termination.pk))
+                for obj in (termination, shared) if shared is not termination else (termination,):
+                    if obj is not None:
+                        obj.refresh_from_db(fields=["cable", "cable_end"])
+
+    def clear(self) -> None:
+        """Drop every instance, e.g. after a rollback left them out of sync with the DB"""
+        self.objects.clear()
+        self.frontport_maps.clear()
+
+
+def create_cassette_frontports(
+    logger: Script, rear_port: RearPort, port_num: int, type: PortTypeChoices, description: str = ""
+) -> list[FrontPort]:
+    """
+    Create every FrontPort (Front{port_num}-{position}) of a new multi-position RearPort (cassette),
+    saved one by one as the other ports (signals & change log)
+    """
+    front_ports = [
+        create_frontport(
+            name=f"Front{port_num}-{position}",
+            type=type,
+            pp=rear_port.device,
+            rear_port=rear_port,
+            description=description,
+            rear_port_position=position,
+        )
+        for position in range(1, rear_port.positions + 1)
+    ]
+    for front_port in front_ports:
+        front_port.full_clean()
+        front_port.save()
+    logger.log_success(f"\tCreated FrontPorts {front_ports[0].name} - {front_ports[-1].name}")
+    return front_ports
+
+
 def create_extra_pp_ports(
     port_num: int, type: PortTypeChoices, pp: Device, logger: Script, allow_skip: bool = False
 ) -> None:
@@ -378,11 +924,51 @@ def check_circuit_duplicate(cid: str, provider: Provider) -> bool:
         return True  # Duplicate found
 
 
-def save_terminations(logger: Script, termination: list):
+def get_existing_circuit(cid: str, provider: Provider) -> Circuit | None:
+    """
+    Retrieve an existing circuit, prefetching its terminations (with their site, provider network & cable).
+    """
+    terminations = CircuitTermination.objects.select_related("site", "provider_network", "cable")
+    return (
+        Circuit.objects.filter(cid=cid, provider=provider)
+        .select_related("type")
+        .prefetch_related(Prefetch("terminations", queryset=terminations))
+        .first()
+    )
+
+
+def update_changed_fields(obj, **values) -> list[str]:
+    """
+    Set only the attributes whose value differs from the current one (dates are compared as ISO strings).
+    Existing objects are snapshotted (change log) before the first change.
+
+    Returns:
+        The names of the changed attributes, empty if nothing changed (no need to save)
+    """
+    changed = {}
+    for name, value in values.items():
+        current = getattr(obj, name)
+        if isinstance(current, datetime.date) and isinstance(value, str):
+            current = current.isoformat()
+        if current != value:
+            changed[name] = value
+
+    if changed and obj.pk and hasattr(obj, "snapshot"):
+        obj.snapshot()
+    for name, value in changed.items():
+        setattr(obj, name, value)
+
+    return list(changed)
+
+
+def save_terminations(logger: Script, termination: list, changed: bool = True):
     """
     Save terminations.
     """
     if isinstance(termination, CircuitTermination):
+        if termination.pk and not changed:
+            logger.log_info(f"\tTermination {termination.term_side} unchanged, skipping save")
+            return
         termination.full_clean()
         termination.save()
         name = termination.site if termination.site else termination.provider_network
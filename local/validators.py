@@ -1,7 +1,20 @@
-from circuits.models import Circuit, CircuitType, ProviderNetwork
-from dcim.models import Interface, RearPort, Site
+from typing import Callable, NamedTuple
+
+from circuits.models import Circuit
 from extras.scripts import Script
 from extras.validators import CustomValidator
+from local.topology import INTERFACE, REAR_PORT, TopologyGraph
+
+P2P_CIRCUIT_TYPE = "P2P (Point to Point)"
+VALIDATION_CHUNK_SIZE = 1000  # Circuits fetched per query when validating many circuits
+
+# Circuit kinds, from the terminations (see CircuitValidator.validate)
+STANDARD = "Standard"
+P2P = "P2P"
+
+# Topology graph relations read by the rules
+TERMINATIONS = "terminations"  # Circuit terminations: sites, provider networks & cable ids
+PATHS = "paths"  # Cable paths of the terminations, see TopologyGraph.build(trace=...)
 
 
 class PositionValidator(CustomValidator):
@@ -25,158 +38,229 @@ class PositionValidator(CustomValidator):
             self.fail(f"Device with height {height} must be assigned a Rack Position.")
 
 
+class ValidationRule(NamedTuple):
+    """
+    One CircuitValidator check, see register_rule()
+
+    check: function(validator) -> (valid, message), reading validator.circuit, term_a & term_z
+    kinds: circuit kinds checked (STANDARD, P2P)
+    cost: relative cost, the cheapest rules run first and the first failure stops the validation
+    needs: topology graph relations read by the check (TERMINATIONS, PATHS)
+    site_ids: only check the circuits terminated in these sites, None for every circuit
+    """
+
+    name: str
+    check: Callable
+    kinds: frozenset[str]
+    cost: int
+    needs: frozenset[str] = frozenset({TERMINATIONS})
+    site_ids: frozenset[int] | None = None
+
+
+# Registered rules, in cost order
+VALIDATION_RULES: list[ValidationRule] = []
+
+
+def register_rule(rule: ValidationRule) -> None:
+    """Add (or replace, by name) a CircuitValidator rule, rules of the same cost run in registration order"""
+    VALIDATION_RULES[:] = [registered for registered in VALIDATION_RULES if registered.name != rule.name]
+    VALIDATION_RULES.append(rule)
+    VALIDATION_RULES.sort(key=lambda registered: registered.cost)
+
+
 class CircuitValidator(CustomValidator):
     """
     Report to validate whether the Circuit conforms to the 'standard'
     Including Standard, P2P, Meet Me, and 'Direct to Device'
+
+    Reads the circuit topology graph (see local.topology.TopologyGraph), no query per circuit.
+    The checks are the registered ValidationRules (see register_rule), run cheapest first.
     """
 
-    def check_term_site(self, site):
-        if not isinstance(site, Site):
-            return False, f"Unknown Site: ({site})"
+    def log_warning(self, message: str) -> None:
+        if self.logger:
+            self.logger.log_warning(message)
+
+    def check_term_site(self, term):
+        if not term.site_id:
+            return False, f"Unknown Site: ({term.site or None})"
 
         return True, ""
 
-    def check_term_provider_network(self, provider_network):
-        if not isinstance(provider_network, ProviderNetwork):
+    def check_term_provider_network(self, term):
+        if not term.provider_network_id:
             return False, f"Unknown Provider Network: ({self.term_z})"
 
         return True, ""
 
-    def check_standard_cables(self, b_side):
+    def check_standard_cables(self, hops):
+        """
+        hops: the path from the Patch Panel FrontPort: FrontPort -> Interface, or FrontPort -> Meet Me RearPort,
+        Meet Me FrontPort -> Interface
+        """
         meet_me = False
 
-        for term in b_side:
-            front_port = term.frontports.first()
-            device_cable = front_port.cable
-
-            if not device_cable:
-                return (
-                    False,
-                    f"Patch Panel Cable found, but missing Cable on the corresponding FrontPort of RearPort:{term}",
-                )
-
-            if front_port.opposite_cable_end == "A":
-                self.logger.log_warning(
-                    f"Circuit: {self.circuit} -- Warning: Cable ({device_cable}) has cable ends swapped."
-                )
-                cable_side = "a_terminations"
-            else:
-                cable_side = "b_terminations"
-
-            interface = getattr(device_cable, cable_side)
-            if not interface:
-                return False, f"Patch Panel Cable found, but missing Device Cable: {device_cable}"
-            if isinstance(interface[0], RearPort):
-                # Meet Me Extra Cable
-                mm_port = interface[0].frontports.first()
-                device_cable = mm_port.cable
-
-                cable_side = f"{mm_port.opposite_cable_end.lower()}_terminations"
-                interface = getattr(device_cable, cable_side)
-                meet_me = True
-
-            if not isinstance(interface[0], Interface):
-                return False, f"Unsupported Extra Cable, {interface=} / {device_cable.color}, manually review."
+        if not hops:
+            return (
+                False,
+                f"Patch Panel Cable found, but missing Cable on the corresponding FrontPort of RearPort:{self.rear_port}",
+            )
+
+        device_cable = hops[0]
+        if device_cable.near_end == "B":
+            self.log_warning(
+                f"Circuit: {self.circuit} -- Warning: Cable ({device_cable.cable}) has cable ends swapped."
+            )
+
+        if not device_cable.far:
+            return False, f"Patch Panel Cable found, but missing Device Cable: {device_cable.cable}"
+        if device_cable.far[0] == REAR_PORT:
+            # Meet Me Extra Cable
+            if len(hops) < 2:
+                return False, f"Patch Panel Cable found, but missing Device Cable: {device_cable.cable}"
+            device_cable = hops[1]
+            meet_me = True
+
+        if not device_cable.far or device_cable.far[0] != INTERFACE:
+            interface = device_cable.far_name
+            return False, f"Unsupported Extra Cable, {interface=} / {device_cable.color}, manually review."
 
         message = "" if not meet_me else "Meet Me Circuit"
         return True, message
 
-    def cable_check(self, cable):
-        a_side = cable.a_terminations
-        b_side = cable.b_terminations
+    def cable_check(self, term):
+        cable = term.path.hops[0] if term.path and term.path.hops else None
 
-        if not a_side or not b_side:
-            return False, f"Unknown Cable: {cable}"
+        if not cable or not cable.far:
+            return False, f"Unknown Cable: {cable.cable if cable else term.cable_id}"
 
-        if self.term_a.opposite_cable_end == "A":
-            self.logger.log_warning(
-                f"Circuit: {self.circuit} -- Warning: Cable ({self.term_a.cable}) has cable ends swapped."
-            )
-            cable_side = "a_terminations"
-        else:
-            cable_side = "b_terminations"
-
-        b_side = getattr(cable, cable_side)
+        if cable.near_end == "B":
+            self.log_warning(f"Circuit: {self.circuit} -- Warning: Cable ({cable.cable}) has cable ends swapped.")
 
-        if isinstance(b_side[0], RearPort):
-            valid, message = self.check_standard_cables(b_side)
-        elif isinstance(b_side[0], Interface):
+        model, _ = cable.far
+        if model == REAR_PORT:
+            self.rear_port = cable.far_name
+            valid, message = self.check_standard_cables(term.path.hops[1:])
+        elif model == INTERFACE:
             return True, f"Direct to Device"
         else:
-            return False, f"Invalid Cable Termination Type: {cable} -- {type(b_side[0])}"
+            return False, f"Invalid Cable Termination Type: {cable.cable} -- {model}"
 
         return valid, message
 
-    def standard_check(self):
-        """Validate Standard (and Meet Me) Cables"""
-        valid, message = self.check_term_site(self.term_a.site)
-        if not valid:
-            return False, message
-
-        valid, message = self.check_term_provider_network(self.term_z.provider_network)
-        if not valid:
-            return False, f"Standard -- {message}"
+    def standard_site(self):
+        return self.check_term_site(self.term_a)
 
-        cable = self.term_a.cable
-        if not cable:
-            return False, f"Standard -- No Cable found for Termination A."
+    def standard_provider_network(self):
+        return self.check_term_provider_network(self.term_z)
 
-        valid, message = self.cable_check(cable)
+    def standard_cable(self):
+        if not self.term_a.cable_id:
+            return False, f"No Cable found for Termination A."
 
-        message = f"Standard -- {message}" if message else "Standard"
+        return True, ""
 
-        return valid, message
+    def standard_path(self):
+        """Validate Standard (and Meet Me) Cables"""
+        return self.cable_check(self.term_a)
 
-    def p2p_check(self):
-        """Validate P2P Cables"""
-        for site in (self.term_a.site, self.term_z.site):
-            valid, message = self.check_term_site(site)
+    def p2p_sites(self):
+        for term in (self.term_a, self.term_z):
+            valid, message = self.check_term_site(term)
             if not valid:
-                return False, f"P2P -- {message}"
+                return False, message
 
-        if self.circuit.type != CircuitType.objects.get(name="P2P (Point to Point)"):
-            self.logger.log_warning(
+        return True, ""
+
+    def p2p_circuit_type(self):
+        if self.circuit.type != P2P_CIRCUIT_TYPE:
+            self.log_warning(
                 f"Circuit: {self.circuit} -- Warning: P2P Circuit but Circuit Type is set to: {self.circuit.type}"
             )
 
+        return True, ""
+
+    def p2p_cables(self):
         for term in (self.term_a, self.term_z):
-            cable = term.cable
-            if not cable:
-                return False, f"P2P -- No Cable found for Termination {term.term_side}:"
-            valid, message = self.cable_check(cable)
-            if not valid:
-                return valid, f"P2P -- {message}"
+            if not term.cable_id:
+                return False, f"No Cable found for Termination {term.term_side}:"
 
-        message = f"P2P -- {message}" if message else "P2P"
+        return True, ""
+
+    def p2p_paths(self):
+        """Validate P2P Cables"""
+        for term in (self.term_a, self.term_z):
+            valid, message = self.cable_check(term)
+            if not valid:
+                return valid, message
 
         return valid, message
 
-    def validate(self, circuit: Circuit, logger: Script = None) -> tuple[bool, str]:
-        """Validate Circuit to meet the 'standard'"""
+    @staticmethod
+    def needs() -> set[str]:
+        """Topology graph relations read by the registered rules, to load the graph with (see TopologyGraph.load)"""
+        return set().union(*(rule.needs for rule in VALIDATION_RULES))
+
+    def get_rules(self, kind: str) -> list[ValidationRule]:
+        """Rules of the circuit, in cost order"""
+        site_ids = {self.term_a.site_id, self.term_z.site_id}
+        return [
+            rule
+            for rule in VALIDATION_RULES
+            if kind in rule.kinds and (rule.site_ids is None or not rule.site_ids.isdisjoint(site_ids))
+        ]
+
+    def validate(self, circuit: Circuit, logger: Script = None, graph: TopologyGraph = None) -> tuple[bool, str]:
+        """
+        Validate Circuit to meet the 'standard'
+
+        graph: topology graph including the circuit (see TopologyGraph.load), built for this circuit only if not given
+        """
         self.logger = logger
-        self.circuit = circuit
-        self.term_a = circuit.termination_a
-        self.term_z = circuit.termination_z
+        if graph is None or circuit.pk not in graph.circuits:
+            graph = TopologyGraph.build({circuit.pk}, trace=PATHS in self.needs())
+        self.circuit = graph.circuits[circuit.pk]
+        self.term_a = self.circuit.terminations.get("A")
+        self.term_z = self.circuit.terminations.get("Z")
 
         if not self.term_a:
             return False, "Invalid -- No Termination A"
         if not self.term_z:
             return False, "Invalid -- No Termination Z"
 
-        if self.term_a.site is not None and self.term_z.site is not None:
-            valid, message = self.p2p_check()
-        elif self.term_a.site and self.term_z.provider_network:
-            valid, message = self.standard_check()
+        if self.term_a.site_id is not None and self.term_z.site_id is not None:
+            kind = P2P
+        elif self.term_a.site_id and self.term_z.provider_network_id:
+            kind = STANDARD
         else:
             return (
                 False,
                 f"Missing or Invalid Circuit Terminations: {self.circuit} - Termination A: {self.term_a}, - Termination Z: {self.term_z}",
             )
 
-        if valid:
-            message = f"Valid -- {message}"
-        else:
-            message = f"Invalid -- {message}"
-
-        return valid, message
+        detail = ""
+        for rule in self.get_rules(kind):
+            valid, message = rule.check(self)
+            if not valid:
+                return False, f"Invalid -- {kind} -- {message}"
+            detail = message or detail
+
+        message = f"{kind} -- {detail}" if detail else kind
+        return True, f"Valid -- {message}"
+
+
+for rule in (
+    ValidationRule("standard_site", CircuitValidator.standard_site, frozenset({STANDARD}), cost=1),
+    ValidationRule(
+        "standard_provider_network", CircuitValidator.standard_provider_network, frozenset({STANDARD}), cost=1
+    ),
+    ValidationRule("standard_cable", CircuitValidator.standard_cable, frozenset({STANDARD}), cost=2),
+    ValidationRule(
+        "standard_path", CircuitValidator.standard_path, frozenset({STANDARD}), cost=10, needs=frozenset({PATHS})
+    ),
+    ValidationRule("p2p_sites", CircuitValidator.p2p_sites, frozenset({P2P}), cost=1),
+    ValidationRule("p2p_circuit_type", CircuitValidator.p2p_circuit_type, frozenset({P2P}), cost=1),
+    ValidationRule("p2p_cables", CircuitValidator.p2p_cables, frozenset({P2P}), cost=2),
+    ValidationRule("p2p_paths", CircuitValidator.p2p_paths, frozenset({P2P}), cost=10, needs=frozenset({PATHS})),
+):
+    register_rule(rule)
@@ -1,6 +1,7 @@
 from circuits.models import Circuit
 from dcim.models import Device
 from extras.reports import Report
+from local.topology import TopologyGraph
 
 # from local.validators import MyCircuitValidator
 
@@ -12,18 +13,19 @@ class CircuitCableReport(Report):
 
     def test_circuit_cables(self):
         circuits = Circuit.objects.all()
+        graph = TopologyGraph.load()
         circuits_with = []
         circuits_without = []
 
         for circuit in circuits:
             self.log_success(circuit)
-            terms = circuit.terminations.all()
+            terms = graph.circuits[circuit.pk].terminations.values() if circuit.pk in graph.circuits else []
             if not terms:
                 circuits_without.append(circuit)
                 continue
             count = 0
             for term in terms:
-                if term.cable:
+                if term.cable_id:
                     count += 1
             if count == 0:
                 circuits_without.append(circuit)
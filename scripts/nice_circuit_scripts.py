@@ -1,9 +1,15 @@
 from circuits.models import Circuit
-from dcim.models import Device, FrontPort, RearPort, Site
-from extras.scripts import BooleanVar, ObjectVar, Script, StringVar
+from dcim.models import Device, FrontPort, Interface, RearPort, Region, Site
+from extras.scripts import BooleanVar, MultiObjectVar, ObjectVar, Script, StringVar
+from local.bulk_jobs import fan_out, log_summary
+from local.bulk_planner import BulkPlanner, plan_report
+from local.circuit_diagrams import circuit_diagrams_markdown
+from local.circuit_export import iter_circuits_csv
 from local.nice_circuits import NiceBulkCircuits, NiceP2PCircuit, NiceStandardCircuit
-from local.utils import pp_port_update, validate_user
-from local.validators import CircuitValidator
+from local.topology import TopologyGraph
+from local.utils import ProgressReporter, pp_port_update, validate_user
+from local.validators import PATHS, VALIDATION_CHUNK_SIZE, CircuitValidator
+from rq import get_current_job
 from utilities.exceptions import AbortScript
 
 
@@ -39,6 +45,8 @@ class StandardCircuit(Script):
                     "interface",
                     "direct_to_device",
                     "create_pp_port",
+                    "pp_port_position",
+                    "pp_port_positions",
                 ),
             ),
             (
@@ -73,6 +81,8 @@ class StandardCircuit(Script):
         pp_new_port,
         pp_port,
         pp_port_description,
+        pp_port_position,
+        pp_port_positions,
         provider,
         review,
         side_a_site,
@@ -119,6 +129,8 @@ class P2PCircuit(Script):
                     "interface",
                     "direct_to_device",
                     "create_pp_port",
+                    "pp_port_position",
+                    "pp_port_positions",
                 ),
             ),
             (
@@ -134,6 +146,8 @@ class P2PCircuit(Script):
                     "z_interface",
                     "z_direct_to_device",
                     "z_create_pp_port",
+                    "z_pp_port_position",
+                    "z_pp_port_positions",
                 ),
             ),
             (
@@ -168,6 +182,8 @@ class P2PCircuit(Script):
         pp_new_port,
         pp_port,
         pp_port_description,
+        pp_port_position,
+        pp_port_positions,
         provider,
         review,
         side_a_site,
@@ -183,6 +199,8 @@ class P2PCircuit(Script):
         z_pp_new_port,
         z_pp_port,
         z_pp_port_description,
+        z_pp_port_position,
+        z_pp_port_positions,
         z_xconnect_id,
     )
 
@@ -208,10 +226,17 @@ class BulkCircuits(Script):
         # Organize the GUI Layout
         fieldsets = (
             ("Import CSV", ("bulk_circuits",)),
-            ("Advanced Options", ("circuit_num", "overwrite")),
+            ("Advanced Options", ("circuit_num", "overwrite", "skip_unchanged", "fan_out_jobs", "plan_only")),
         )
 
-    from local.display_fields import bulk_circuits, circuit_num, overwrite
+    from local.display_fields import (
+        bulk_circuits,
+        circuit_num,
+        fan_out_jobs,
+        overwrite,
+        plan_only,
+        skip_unchanged,
+    )
 
     # Run BulkCircuits
     def run(self, data, commit):
@@ -219,30 +244,43 @@ class BulkCircuits(Script):
         if not allowed:
             raise AbortScript(f"User '{self.request.user}' does not have permission to run this script.")
 
-        circuits = NiceBulkCircuits.from_csv(
-            logger=self, overwrite=data["overwrite"], filename=data["bulk_circuits"], circuit_num=data["circuit_num"]
+        if data.get("plan_only"):
+            return self.plan(data)
+
+        rows = NiceBulkCircuits.load_rows(filename=data["bulk_circuits"], circuit_num=data["circuit_num"])
+
+        if (data.get("fan_out_jobs") or 0) > 1:
+            return self.fan_out(data, rows, commit)
+
+        # No checkpoint here: the script runs in a single transaction, a dead job rolls back every row it wrote
+        # (see the nice_bulk_circuits management command to resume large imports)
+        progress = ProgressReporter(self.log_info)
+        progress.start("Staging", len(rows))
+        staged_circuits = NiceBulkCircuits.stage_rows(logger=self, rows=rows, overwrite=data["overwrite"])
+        progress.update(len(rows))
+        results = NiceBulkCircuits.create_circuits(
+            logger=self,
+            staged_circuits=staged_circuits,
+            skip_unchanged=data["skip_unchanged"],
+            progress=progress,
         )
-        results = {}
-        for circuit in circuits:
-            result = circuit.create()
-            results[circuit.cid] = {"result": result, "description": circuit.description}
 
         # Output
         output_success = "| Circuit ID | Description |\n"
         output_success += "|------------|-------------|\n"
         success_count = 0
-        for cid, result in results.items():
+        for result in results.values():
             if result["result"]:
                 success_count += 1
-                output_success += f"| {cid} | {result['description']}|\n"
+                output_success += f"| {result['cid']} | {result['description']}|\n"
 
         output_fail = "| Circuit ID | Description |\n"
         output_fail += "|------------|-------------|\n"
         fail_count = 0
-        for cid, result in results.items():
+        for result in results.values():
             if not result["result"]:
                 fail_count += 1
-                output_fail += f"| {cid} | {result['description']}|\n"
+                output_fail += f"| {result['cid']} | {result['description']}|\n"
 
         if success_count:
             self.log_info("---")
@@ -253,6 +291,52 @@ class BulkCircuits(Script):
             self.log_failure("**Failures:**")
             self.log_failure(output_fail)
 
+        throughput = progress.summary()
+        self.log_info(throughput)
+        return throughput
+
+    def fan_out(self, data, rows, commit):
+        """Enqueue the import as site-partitioned background jobs, aggregated by a parent job"""
+        if not commit:
+            raise AbortScript("Background jobs can't be rolled back, enable 'Commit changes' to use them.")
+
+        # This run's own RQ job (None outside of a worker): the summary job appends to its log once it's saved
+        script_job = get_current_job()
+        jobs, parent = fan_out(
+            rows,
+            data["fan_out_jobs"],
+            overwrite=data["overwrite"],
+            skip_unchanged=data["skip_unchanged"],
+            script_job_id=script_job.id if script_job else None,
+        )
+        for job in jobs:
+            self.log_info(f"Enqueued chunk job: {job.id}")
+        self.log_success(f"Enqueued {len(jobs)} chunk jobs for {len(rows)} rows, summary job: {parent.id}")
+
+        if parent.result is not None:
+            log_summary(self, parent.result)
+        else:
+            self.log_info("The import summary is appended to this log once every chunk job finished.")
+
+        return parent.id
+
+    def plan(self, data):
+        """Dry run, the import rolled back (see BulkPlanner), and output the planned changes"""
+        rows = NiceBulkCircuits.load_rows(filename=data["bulk_circuits"], circuit_num=data["circuit_num"])
+        plans = BulkPlanner(rows, overwrite=data["overwrite"]).plan()
+
+        for plan in plans:
+            if plan.valid:
+                self.log_success(f"Row {plan.row_num}: {plan.cid} -- {plan.action}")
+            else:
+                for error in plan.errors:
+                    self.log_failure(f"Row {plan.row_num}: {plan.cid} -- {error}")
+
+        fail_count = sum(1 for plan in plans if not plan.valid)
+        self.log_info(f"Planned {len(plans)} rows, {len(plans) - fail_count} valid, {fail_count} with errors.")
+
+        return plan_report(plans)
+
 
 class UpdatePatchPanelPorts(Script):
     """
@@ -332,10 +416,16 @@ class CircuitValidation(Script):
         scheduling_enabled = False
         description = "Display whether a Circuit or Circuits are 'valid'."
 
-    site = ObjectVar(
+    sites = MultiObjectVar(
         model=Site,
-        label="Find Circuit(s) in Site:",
-        description="Leave blank to find all Sites:",
+        label="Find Circuit(s) in Site(s):",
+        description="Leave blank (and Region blank) to find all Sites",
+        required=False,
+    )
+    regions = MultiObjectVar(
+        model=Region,
+        label="Find Circuit(s) in Region(s):",
+        description="Every Site of the Region(s), including child Regions",
         required=False,
     )
     circuit = ObjectVar(
@@ -343,40 +433,164 @@ class CircuitValidation(Script):
         label="Circuit",
         description="Leave Blank to find all Circuits",
         required=False,
-        query_params={"site_id": "$site"},
+        query_params={"site_id": "$sites"},
     )
 
+    def get_site_ids(self, sites, regions) -> set[int]:
+        site_ids = {site.pk for site in sites or []}
+        if regions:
+            regions = Region.objects.get_queryset_descendants(Region.objects.filter(pk__in=regions), include_self=True)
+            site_ids |= set(Site.objects.filter(region__in=regions).values_list("pk", flat=True))
+        return site_ids
+
     def run(self, data, commit):
         validator = CircuitValidator()
+        trace = PATHS in validator.needs()  # Cable paths only loaded if a rule reads them
         circuit = data["circuit"]
-        site = data["site"]
 
+        graph = None
         if circuit:
             circuits = [circuit]
-        elif site:
-            circuits_a = Circuit.objects.filter(termination_a__site__name=site.name)
-            circuits_z = Circuit.objects.filter(termination_z__site__name=site.name)
-            circuits = circuits_a | circuits_z
+            total = 1
+        elif data["sites"] or data["regions"]:
+            site_ids = self.get_site_ids(data["sites"], data["regions"])
+            queryset = Circuit.objects.filter(terminations__site_id__in=site_ids).distinct().only("pk", "cid")
+            total = queryset.count()  # Before iterating, an iterator has no length
+            circuits = queryset.order_by("pk").iterator(chunk_size=VALIDATION_CHUNK_SIZE)
+            graph = TopologyGraph.load(site_ids, trace) if site_ids else None
         else:
-            circuits = Circuit.objects.all()
+            circuits = Circuit.objects.only("pk", "cid").order_by("pk").iterator(chunk_size=VALIDATION_CHUNK_SIZE)
+            graph = TopologyGraph.load(trace=trace)
+            total = len(graph.circuits)
 
-        if not circuits:
-            self.log_info(f"No Circuits found.")
-        circuits_valid = []
-        circuits_invalid = []
+        circuits_valid = 0
+        circuits_invalid = 0
 
+        progress = ProgressReporter(self.log_info)
+        progress.start("Validating", total)
         for circuit in circuits:
-            valid, message = validator.validate(circuit, logger=self)
+            valid, message = validator.validate(circuit, logger=self, graph=graph)
 
             if valid:
-                circuits_valid.append({"circuit": circuit, "message": message})
+                circuits_valid += 1
                 log = self.log_success
             else:
-                circuits_invalid.append({"circuit": circuit, "message": message})
+                circuits_invalid += 1
                 log = self.log_failure
 
             log(f"Circuit: {circuit} -- {message:>20}")
+            progress.update(failed=not valid)
+
+        if not circuits_valid + circuits_invalid:
+            self.log_info(f"No Circuits found.")
+
+        throughput = progress.summary()
+        self.log_info(throughput)
+        return f"Valid: {circuits_valid}, Invalid: {circuits_invalid}\n{throughput}"
 
 
-script_order = (StandardCircuit, P2PCircuit, BulkCircuits, UpdatePatchPanelPorts, CircuitValidation)
+class ExportCircuits(Script):
+    class Meta:
+        name = "Export Circuits"
+        commit_default = False
+        scheduling_enabled = False
+        description = "Export Circuits as a CSV, re-importable with Bulk Circuits."
+
+    site = ObjectVar(
+        model=Site,
+        label="Export Circuit(s) in Site:",
+        description="Leave blank to export all Sites",
+        required=False,
+    )
+
+    def run(self, data, commit):
+        circuits = Circuit.objects.all()
+        if data["site"]:
+            circuits = circuits.filter(terminations__site=data["site"]).distinct()
+
+        return "".join(iter_circuits_csv(circuits))
+
+
+class CircuitDiagrams(Script):
+    class Meta:
+        name = "Circuit Diagrams"
+        commit_default = False
+        scheduling_enabled = False
+        description = "Render the actual path of Circuits as Mermaid diagrams."
+
+    site = ObjectVar(
+        model=Site,
+        label="Circuit(s) in Site:",
+        description="Leave blank to use the Circuits below",
+        required=False,
+    )
+    circuits = MultiObjectVar(
+        model=Circuit,
+        label="Circuits",
+        description="Leave blank (and Site blank) for all Circuits",
+        required=False,
+        query_params={"site_id": "$site"},
+    )
+
+    def run(self, data, commit):
+        circuits = Circuit.objects.all()
+        if data["circuits"]:
+            circuits = circuits.filter(pk__in=[circuit.pk for circuit in data["circuits"]])
+        elif data["site"]:
+            circuits = circuits.filter(terminations__site=data["site"]).distinct()
+
+        diagrams = circuit_diagrams_markdown(circuits)
+        if not diagrams:
+            self.log_info("No Circuits found.")
+        return diagrams
+
+
+class InterfaceCircuitLookup(Script):
+    class Meta:
+        name = "Interface Circuit Lookup"
+        commit_default = False
+        scheduling_enabled = False
+        description = "Find the Circuit(s) cabled to a Device Interface (through any Patch Panels)."
+
+    device = ObjectVar(model=Device, label="Device", required=True)
+    interface = ObjectVar(
+        model=Interface,
+        label="Interface",
+        required=True,
+        query_params={"device_id": "$device"},
+    )
+    rebuild = BooleanVar(
+        label="Rebuild the topology?",
+        description="Retrace every circuit, instead of reading the cached topology graph",
+        default=False,
+    )
+
+    def run(self, data, commit):
+        graph = TopologyGraph.build() if data["rebuild"] else TopologyGraph.load()
+        interface = data["interface"]
+        paths = graph.lookup_interface(interface.pk)
+
+        if not paths:
+            self.log_info(f"No Circuit found on {data['device']} / {interface}.")
+            return
+
+        circuits = Circuit.objects.in_bulk({path.circuit_id for path in paths})
+        for path in paths:
+            patch_panels = len(path.ports) // 2
+            self.log_success(
+                f"{data['device']} / {interface}: Circuit {circuits.get(path.circuit_id)} -- "
+                f"Termination {path.term_side}, {patch_panels} Patch Panel(s)"
+            )
+
+
+script_order = (
+    StandardCircuit,
+    P2PCircuit,
+    BulkCircuits,
+    UpdatePatchPanelPorts,
+    CircuitValidation,
+    InterfaceCircuitLookup,
+    CircuitDiagrams,
+    ExportCircuits,
+)
 name = "NICE InContact Single Circuit Manager"